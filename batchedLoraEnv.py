@@ -0,0 +1,219 @@
+from gym import spaces
+import numpy as np
+try:
+    from stable_baselines3.common.vec_env import VecEnv
+except ImportError:
+    # Without stable-baselines3 (e.g. evaluating a numpyPolicy.NumpyPolicy) only the stepping API is available
+    class VecEnv:
+        def __init__(self, num_envs, observation_space, action_space):
+            self.num_envs = num_envs
+            self.observation_space = observation_space
+            self.action_space = action_space
+
+        def step(self, actions):
+            self.step_async(actions)
+            return self.step_wait()
+from loraPhy import Q_MAX, QR, MAX_BATTERY_LEVEL, ACTION_BER, ACTION_TXR, action_table, packet_reception_rate, \
+    duty_cycle_cost, step_reward
+from loraEnv import spawn_seeds, make_rngs
+
+
+class BatchedLoraEnv(VecEnv):
+    """
+    K independent frontier nodes stepped together with NumPy.
+    The q/e/n state of every node is kept in arrays of shape (K,) and one call to step()
+    advances all of them. Frontier node i owns the random generators of
+    loraEnv(N, seed=spawn_seeds(seed, K)[i]), so the observations and rewards are bit-identical
+    to K separate loraEnv instances seeded like that, whatever K is.
+    The priorities of the packets never change the metrics (see make_rngs), so they are not drawn.
+    Like other VecEnvs, a frontier node whose episode is over is reset at once and its last
+    observation is returned in info['terminal_observation'].
+
+    :param num_envs: (int) number of frontier nodes (K)
+    :param N: (int) number of external nodes, as in loraEnv(N), or one per frontier node (array of shape (K,))
+    :param normalize_obs: (bool) as in loraEnv, the observations are then a (K, 3) float32 array
+    :param seed: (int, SeedSequence or None) root seed of the K frontier nodes
+    :param auto_reset: (bool) reset finished frontier nodes. If False they keep their last state and go on
+      being stepped (their results are meaningless) so that an evaluation can step all the nodes in lockstep
+    """
+
+    def __init__(self, num_envs, N, normalize_obs=False, seed=None, auto_reset=True):
+        self.N = N
+        self.N_per_env = np.broadcast_to(np.asarray(N, dtype=int), (num_envs,)).copy()
+        self.normalize_obs = normalize_obs
+        self.auto_reset = auto_reset
+        self.min = np.zeros(3)
+        self.max = np.array([Q_MAX, MAX_BATTERY_LEVEL, self.N_per_env.max()], dtype=np.float64)
+        action_space = spaces.Discrete(12)
+        if self.normalize_obs:
+            observation_space = spaces.Box(low=0, high=1, shape=(3,), dtype=np.float32)
+        else:
+            observation_space = spaces.Box(low=self.min, high=self.max, shape=(3,), dtype=np.float64)
+        super(BatchedLoraEnv, self).__init__(num_envs, observation_space, action_space)
+        self.seed(seed)
+
+        self.q = np.full(num_envs, Q_MAX)
+        self.e = np.full(num_envs, MAX_BATTERY_LEVEL)
+        self.n = self.N_per_env.copy()
+        self.pdr = np.full(num_envs, -1.0)
+        self.prr = np.zeros(num_envs)
+        self.ber = np.zeros(num_envs)
+
+        # Physics of each action for this N (see loraPhy.action_table), only the energy depends on N
+        self.action_table = action_table(self.N)
+        self.ber_table = ACTION_BER
+        self.txr_table = ACTION_TXR
+        self.e_pkt_table = self.action_table['e_pkt']  # (12,) or (12, K) with one N per frontier node
+        self.env_indices = np.arange(num_envs)
+        self.actions = np.zeros(num_envs, dtype=int)
+
+    def step_async(self, actions):
+        self.actions = np.asarray(actions, dtype=int)
+
+    def step_wait(self):
+        actions = self.actions
+        n = self.n
+
+        # discard_lowest_g_packets removes ceil(to_remove) packets, lowest priorities first,
+        # so only the number of transmitted packets matters for the metrics
+        max_packages = n / 2
+        to_remove = n - max_packages
+        transmitted = n - np.minimum(np.ceil(np.maximum(to_remove, 0)), n).astype(int)
+
+        # PDR local
+        self.pdr = transmitted / n
+
+        # PRR
+        self.ber = self.ber_table[actions]
+        self.prr = packet_reception_rate(self.ber, transmitted)
+
+        # Update q value
+        rest_action = duty_cycle_cost(transmitted, self.txr_table[actions])
+        self.q = self.q - rest_action
+
+        # ENERGY
+        if self.e_pkt_table.ndim == 1:
+            e_pkt = self.e_pkt_table[actions]
+        else:
+            e_pkt = self.e_pkt_table[actions, self.env_indices]
+        self.e = self.e - e_pkt
+
+        # The episode ends when the battery is empty or the transmission overdraws the duty-cycle budget,
+        # otherwise QR is replenished for the next period
+        dones = (self.e <= 0) | (self.q <= 0)
+        self.e = np.maximum(self.e, 0)
+        self.q = np.where(dones, np.maximum(self.q, 0), np.minimum(self.q + QR, Q_MAX))
+
+        # reward
+        rewards = step_reward(self.prr, self.pdr, e_pkt)
+
+        observations = self._observations()
+        infos = [{} for _ in range(self.num_envs)]
+        if not self.auto_reset:
+            return observations, rewards, dones, infos
+
+        # Finished frontier nodes start a new episode, as DummyVecEnv does
+        for i in np.flatnonzero(dones):
+            infos[i]['terminal_observation'] = observations[i].copy()
+            self.q[i] = Q_MAX
+            self.e[i] = MAX_BATTERY_LEVEL
+            self.n[i] = self.rngs[i].integers(1, self.N_per_env[i], endpoint=True)
+            self.pdr[i] = -1
+            self.prr[i] = 0
+        if dones.any():
+            observations[dones] = self._observations()[dones]
+        return observations, rewards, dones, infos
+
+    def _observations(self):
+        if self.normalize_obs:
+            # A new array every time: SB3 keeps the observations of the last step (_last_obs) while stepping
+            return np.stack([self.q / Q_MAX, self.e / MAX_BATTERY_LEVEL, self.n / self.N_per_env],
+                            axis=1).astype(np.float32)
+        return np.stack([self.q, self.e, self.n], axis=1).astype(np.float64)
+
+    def reset(self):
+        self.q = np.full(self.num_envs, Q_MAX)  # 706 at the beginning
+        self.e = np.full(self.num_envs, MAX_BATTERY_LEVEL)
+        self.n = np.array([rng.integers(1, N, endpoint=True) for rng, N in zip(self.rngs, self.N_per_env)])
+        self.pdr = np.full(self.num_envs, -1.0)
+        self.prr = np.zeros(self.num_envs)
+        return self._observations()
+
+    def set_nodes(self, N):
+        """
+        Same as loraEnv.set_nodes for every frontier node.
+        :param N: (int or array of shape (K,)) number of external nodes of each frontier node
+        """
+        self.q = np.full(self.num_envs, Q_MAX)
+        self.e = np.full(self.num_envs, MAX_BATTERY_LEVEL)
+        self.n = np.broadcast_to(np.asarray(N, dtype=int), (self.num_envs,)).copy()
+        return self._observations()
+
+    def get_pdr(self):
+        return self.pdr
+
+    def get_prr(self):
+        return self.prr
+
+    def get_energy(self):
+        return self.e
+
+    def get_ber(self):
+        return self.ber
+
+    def close(self):
+        pass
+
+    def seed(self, seed=None):
+        """
+        Restart the random generators of the frontier nodes, node i is seeded with spawn_seeds(seed, K)[i]
+        :param seed: (int, SeedSequence or None) root seed
+        """
+        seeds = spawn_seeds(seed, self.num_envs)
+        # Only the episode generators are used, see make_rngs
+        self.rngs = [make_rngs(env_seed)[0] for env_seed in seeds]
+        return seeds
+
+    def _indices(self, indices):
+        if indices is None:
+            return range(self.num_envs)
+        if isinstance(indices, int):
+            return [indices]
+        return indices
+
+    def get_attr(self, attr_name, indices=None):
+        value = getattr(self, attr_name)
+        if isinstance(value, np.ndarray) and value.shape[:1] == (self.num_envs,):
+            return [value[i] for i in self._indices(indices)]
+        return [value for _ in self._indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        current = getattr(self, attr_name)
+        if isinstance(current, np.ndarray) and current.shape[:1] == (self.num_envs,):
+            for i in self._indices(indices):
+                current[i] = value
+        else:
+            setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        """
+        Call a method of BatchedLoraEnv, once for all the frontier nodes since they share this object, so indices
+        must select all of them. Like get_attr, a result with one value per frontier node is split among them and
+        any other result is repeated for each of them.
+        :raises ValueError: if indices leaves out some frontier node
+        """
+        indices = self._indices(indices)
+        if sorted(indices) != list(range(self.num_envs)):
+            raise ValueError('BatchedLoraEnv methods act on all the frontier nodes, call ' + method_name +
+                             ' with indices=None')
+        value = getattr(self, method_name)(*method_args, **method_kwargs)
+        if isinstance(value, np.ndarray) and value.shape[:1] == (self.num_envs,):
+            return [value[i] for i in indices]
+        return [value for _ in indices]
+
+    def get_images(self):
+        # Nothing is rendered
+        return [None for _ in range(self.num_envs)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._indices(indices)]
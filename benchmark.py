@@ -0,0 +1,234 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+import tracemalloc
+import numpy as np
+from loraEnv import loraEnv, discard_lowest_g_packets
+from batchedLoraEnv import BatchedLoraEnv
+from evaluation import evaluate_fixed_action, evaluate_model
+
+# Numbers of external nodes and actions benchmarked by default
+NODES = [10, 100, 1000, 10000]
+ACTIONS = [0, 5, 11]
+# Modules imported by every training worker and evaluation process
+MODULES = ['loraPhy', 'loraEnv', 'evaluation']
+
+
+class FixedPolicy:
+    """Policy with the predict() of an SB3 model that always takes the same action"""
+
+    def __init__(self, action):
+        self.action = action
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True):
+        return self.action, None
+
+
+def step_rate(N, action=0, steps=1000, seed=0, trace=False):
+    """
+    Steps per second of loraEnv(N).step(action) with N external nodes in every episode
+    (a finished episode is restarted with set_nodes(N) and that time is counted as well)
+    :param trace: (bool) collect the trace of every step in a list
+    """
+    records = []
+    env = loraEnv(N, seed=seed, trace=records.append if trace else None)
+    env.set_nodes(N)
+    start = time.perf_counter()
+    for _ in range(steps):
+        _, _, done, _ = env.step(action)
+        if done:
+            env.set_nodes(N)
+    return steps / (time.perf_counter() - start)
+
+
+def batched_step_rate(N, action=0, num_envs=1024, steps=100, seed=0):
+    """Steps per second (num_envs per call) of BatchedLoraEnv with N external nodes in every frontier node"""
+    env = BatchedLoraEnv(num_envs, N, seed=seed)
+    env.set_nodes(N)
+    actions = np.full(num_envs, action)
+    start = time.perf_counter()
+    for _ in range(steps):
+        env.step_async(actions)
+        env.step_wait()
+    return steps * num_envs / (time.perf_counter() - start)
+
+
+def step_allocation(N, action=0, steps=200, seed=0):
+    """
+    Largest amount of memory (bytes) allocated while loraEnv(N).step(action) runs, measured with tracemalloc.
+    The per-node arrays are buffers reused by every step, so it does not grow with N: only the Python objects
+    of the step (metrics, info, the 3 values of the observation) are allocated, while any per-node array would
+    take 8 * N bytes more. Restarting a finished episode is not measured.
+    """
+    env = loraEnv(N, seed=seed)
+    env.set_nodes(N)
+    env.step(action)
+    env.set_nodes(N)
+    peak = 0
+    tracemalloc.start()
+    for _ in range(steps):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        _, _, done, _ = env.step(action)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+        if done:
+            env.set_nodes(N)
+    tracemalloc.stop()
+    return peak
+
+
+def step_profile(N, action=0, steps=1000, seed=0):
+    """
+    Microseconds per step spent in each stage of loraEnv(N).step(action) (see loraEnv.profile_report)
+    :return: dict of stage => microseconds per step
+    """
+    env = loraEnv(N, seed=seed, profile=True)
+    env.set_nodes(N)
+    for _ in range(steps):
+        _, _, done, _ = env.step(action)
+        if done:
+            env.set_nodes(N)
+    return {stage: seconds / steps * 1e6 for stage, seconds in env.profile_seconds.items()}
+
+
+def discard_time(n, repeats=200, seed=0):
+    """
+    Microseconds per call of discard_lowest_g_packets for n nodes with random priorities and n/2 packets allowed,
+    allocating its result (plain) and writing into preallocated buffers (buffered) as loraEnv does
+    :return: (plain, buffered)
+    """
+    to_transmit = np.ones(n, dtype=int)
+    priorities = np.random.default_rng(seed).integers(1, 4, size=n)
+    out = np.empty(n, dtype=int)
+    work = (np.empty(n, dtype=bool), np.empty(n, dtype=int))
+    start = time.perf_counter()
+    for _ in range(repeats):
+        discard_lowest_g_packets(to_transmit, priorities, n / 2)
+    plain = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(repeats):
+        discard_lowest_g_packets(to_transmit, priorities, n / 2, out=out, work=work)
+    buffered = time.perf_counter() - start
+    return plain / repeats * 1e6, buffered / repeats * 1e6
+
+
+def evaluation_time(n_nodes, action=0):
+    """
+    Seconds to evaluate a whole battery with a fixed action, in closed form (evaluate_fixed_action)
+    and step by step with a policy (evaluate_model)
+    :return: (steps of the episode, closed form seconds, step by step seconds)
+    """
+    start = time.perf_counter()
+    results = evaluate_fixed_action(n_nodes, action)
+    closed_form = time.perf_counter() - start
+    start = time.perf_counter()
+    evaluate_model(FixedPolicy(action), n_nodes)
+    step_by_step = time.perf_counter() - start
+    return len(results['energy']), closed_form, step_by_step
+
+
+def import_cost(module, repeats=5):
+    """
+    Seconds and peak resident memory (MB, Linux) of importing module in a fresh interpreter, as a new
+    worker process does. The best of the repeats is kept.
+    :return: (seconds, MB)
+    """
+    # VmHWM is the peak resident memory of this process only, ru_maxrss would include the parent before exec
+    code = ('import time; start = time.perf_counter(); import ' + module + '; seconds = time.perf_counter() - start; '
+            'print(seconds, [line.split()[1] for line in open("/proc/self/status") if line.startswith("VmHWM")][0])')
+    here = os.path.dirname(os.path.abspath(__file__))
+    costs = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', code], cwd=here, capture_output=True, text=True, check=True)
+        seconds, rss_kb = output.stdout.split()
+        costs.append((float(seconds), int(rss_kb) / 1024))
+    return min(costs)
+
+
+def training_rate(n_workers, total_timesteps=20000, N=20, log_dir="logs/benchmark/"):
+    """Steps per second of PPO training with n_workers loraEnv workers (see sac.train)"""
+    from sac import train  # stable-baselines3 and torch are only needed by this benchmark
+    _, elapsed = train(n_workers, total_timesteps, os.path.join(log_dir, str(n_workers)), N)
+    return total_timesteps / elapsed
+
+
+def run_suite(nodes=NODES, actions=ACTIONS, steps=1000, workers=(), timesteps=20000):
+    """
+    Run every benchmark and print its results
+    :param workers: numbers of workers of the PPO training benchmark, none to skip it (it is the slowest one)
+    :return: dict with the environment of the run and one list of records per benchmark
+    """
+    results = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+               'numpy': np.__version__, 'platform': platform.platform(), 'cpus': os.cpu_count()}
+
+    results['import'] = []
+    print("module        import s  peak MB")
+    for module in MODULES:
+        seconds, megabytes = import_cost(module)
+        results['import'].append({'module': module, 'seconds': seconds, 'peak_mb': megabytes})
+        print(f"{module:12s}  {seconds:8.3f}  {megabytes:7.1f}")
+
+    results['step'] = []
+    print("      N  action  steps/s  traced steps/s  batched steps/s  bytes/step")
+    for N in nodes:
+        for action in actions:
+            record = {'N': N, 'action': action, 'steps_per_second': step_rate(N, action, steps),
+                      'traced_steps_per_second': step_rate(N, action, steps, trace=True),
+                      'batched_steps_per_second': batched_step_rate(N, action),
+                      'bytes_per_step': step_allocation(N, action),
+                      'stage_us': step_profile(N, action, steps)}
+            results['step'].append(record)
+            print(f"{N:7d}  {action:6d}  {record['steps_per_second']:7.0f}  {record['traced_steps_per_second']:14.0f}"
+                  f"  {record['batched_steps_per_second']:15.0f}  {record['bytes_per_step']:10d}")
+
+    results['discard'] = []
+    print("      n  plain us  buffered us")
+    for n in nodes:
+        plain, buffered = discard_time(n)
+        results['discard'].append({'n': n, 'plain_us': plain, 'buffered_us': buffered})
+        print(f"{n:7d}  {plain:8.1f}  {buffered:11.1f}")
+
+    results['evaluation'] = []
+    print("n_nodes  action  steps  closed form s  step by step s")
+    for n_nodes in [n for n in nodes if n <= 1000]:
+        for action in actions:
+            episode_steps, closed_form, step_by_step = evaluation_time(n_nodes, action)
+            results['evaluation'].append({'n_nodes': n_nodes, 'action': action, 'steps': episode_steps,
+                                          'closed_form_seconds': closed_form, 'step_by_step_seconds': step_by_step})
+            print(f"{n_nodes:7d}  {action:6d}  {episode_steps:5d}  {closed_form:13.4f}  {step_by_step:14.4f}")
+
+    results['training'] = []
+    if workers:
+        print("workers  steps/s  speed-up")
+    for n_workers in workers:
+        rate = training_rate(n_workers, timesteps)
+        results['training'].append({'workers': n_workers, 'timesteps': timesteps, 'steps_per_second': rate})
+        print(f"{n_workers:7d}  {rate:7.0f}  {rate / results['training'][0]['steps_per_second']:8.2f}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark loraEnv, the evaluation and the training')
+    parser.add_argument('--nodes', type=int, nargs='+', default=NODES, help='N of loraEnv(N)')
+    parser.add_argument('--actions', type=int, nargs='+', default=ACTIONS)
+    parser.add_argument('--steps', type=int, default=1000, help='steps of loraEnv per N and action')
+    parser.add_argument('--workers', type=int, nargs='*', default=[],
+                        help='numbers of workers of the PPO training benchmark, e.g. 1 2 4 8 (skipped by default)')
+    parser.add_argument('--timesteps', type=int, default=20000, help='timesteps of each training')
+    parser.add_argument('--output', default='benchmarks/results.json', help='JSON file with the results')
+    args = parser.parse_args()
+
+    results = run_suite(args.nodes, args.actions, args.steps, args.workers, args.timesteps)
+    results['argv'] = sys.argv[1:]
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print('Results saved in ' + args.output)
+
+
+if __name__ == '__main__':
+    main()
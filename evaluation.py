@@ -1,9 +1,12 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from stable_baselines3 import PPO, A2C, TD3, SAC
 import math
 import random
-from loraEnv import loraEnv
+from loraEnv import loraEnv, discard_lowest_g_packets
+from loraPhy import MAX_BATTERY_LEVEL, Q_MAX, QR, action_table, packet_reception_rate, duty_cycle_cost
+from store import ResultStore
+from metricsRecorder import MetricsRecorder, StreamRecorder
+
+METRICS = ['pdr', 'prr', 'energy', 'ber']
 
 # An useful function to plot averages (typically used for rewards or whenever many iterations are plotted)
 def smooth(y, box_pts):
@@ -11,44 +14,158 @@ def smooth(y, box_pts):
     y_smooth = np.convolve(y, box, mode='same')
     return y_smooth
 
-# Load model
-model = PPO.load("logs/best_model.zip") # para cargar modelo que se haya generado en el solver
-# We can test, e.g., SAC and TD3.
-# We need to check in the webpage of SB3 whether they are compatible with the kind of observation and action we are working with.
-observation = []
-
-prr = []
-pdr = []
-energy = []
-ber = []
-env = loraEnv(20)
-#state = env.reset()
-state = env.set_nodes(20)
-count = 0
-
-while env.e > 0:
-    count += 1
-    # Evaluade model with predict() method
-    #action, _state = model.predict(state)  # predecimos la acción más recomendada para ese estado
-    env.step(5)
-    state = env.state
-    prr.append(env.get_prr())
-    pdr.append(env.get_pdr())
-    energy.append(env.get_energy())
-    ber.append(env.get_ber())
-
-print(count)
-#battery_life = count * env.T / (60*24*365)  # cuanto tiempo (años) he estado tx antes de que se me acabe la batería
-#print(battery_life)
-
-np.savetxt("results/pdr_15_6.txt", pdr, delimiter=",")
-np.savetxt("results/prr_15_6.txt", prr, delimiter=",")
-np.savetxt("results/energy_15_6.txt", energy, delimiter=",")
-np.savetxt("results/ber_15_6.txt", ber, delimiter=",")
 
+def evaluate_fixed_action(n_nodes, action, N=None):
+    """
+    Evaluate a frontier node that always takes the same action until the episode ends (battery empty
+    or duty-cycle budget overdrawn), that is, the same values as collecting get_pdr(), get_prr(),
+    get_energy() and get_ber() after every step of
+        env = loraEnv(N); env.set_nodes(n_nodes); done = False
+        while not done: _, _, done, _ = env.step(action)
+    With a fixed action PDR, PRR and BER are the same at every step (only the ids of the discarded
+    packets are random, not how many) and the energy and duty-cycle budget drop by the same amount,
+    so no step is simulated.
+    :param n_nodes: (int) number of external nodes of the frontier node
+    :param action: (int) action taken at every step
+    :param N: (int) number of external nodes the environment is created with (it sets the payload), n_nodes by default
+    :return: dict with one array per metric (pdr, prr, energy, ber) holding one value per step
+    """
+    if N is None:
+        N = n_nodes
+    config = action_table(N)[action]
+    ber = float(config['ber'])
+    e_pkt = float(config['e_pkt'])
+
+    # Packets that survive the discarding, the priorities do not change how many are removed
+    to_transmit = np.ones(n_nodes).astype(int)
+    transmitted = discard_lowest_g_packets(to_transmit, to_transmit, n_nodes / 2)
+    n_transmitted = np.sum(transmitted)
+    pdr = n_transmitted / np.sum(to_transmit)
+    prr = packet_reception_rate(ber, n_transmitted)
+
+    # Energy after every step, subtract.accumulate repeats the subtractions of step() one after the other
+    steps = int(math.ceil(MAX_BATTERY_LEVEL / e_pkt)) + 1
+    energy = np.subtract.accumulate(np.concatenate(([MAX_BATTERY_LEVEL], np.full(steps, e_pkt))))[1:]
+    steps = np.argmax(energy <= 0) + 1
+
+    # Duty-cycle budget: it only runs out if every transmission costs more than the QR replenished per period
+    rest_action = duty_cycle_cost(n_transmitted, float(config['txr']))
+    if rest_action > QR:
+        q = Q_MAX
+        for k in range(steps):
+            q = q - rest_action
+            if q <= 0:
+                steps = k + 1
+                break
+            q = min(q + QR, Q_MAX)
+
+    energy = np.maximum(energy[:steps], 0)
+    return {'pdr': np.full(steps, pdr), 'prr': np.full(steps, prr), 'energy': energy, 'ber': np.full(steps, ber)}
+
+
+def evaluate_model(model, n_nodes, N=None, normalize_obs=False, stream=None, deterministic=True):
+    """
+    Evaluate a trained model step by step until the episode ends (battery empty or duty-cycle budget overdrawn).
+    :param model: SB3 model (or anything with predict(observation))
+    :param n_nodes: (int) number of external nodes of the frontier node
+    :param N: (int) number of external nodes the environment is created with, n_nodes by default
+    :param normalize_obs: (bool) the model was trained with normalized observations (sac.py --normalize-obs)
+    :param stream: (str) optional path where the metrics are written while the rollout runs (see StreamRecorder).
+      If the path holds an interrupted rollout it is resumed, and if it holds a finished one it is just read
+    :param deterministic: (bool) take the most likely action of the model, as numpyPolicy.NumpyPolicy does.
+      False samples the actions of SB3 models
+    :return: dict with one array per metric (pdr, prr, energy, ber) holding one value per step,
+      float32 memory maps of the stream files if stream is given
+    """
+    if N is None:
+        N = n_nodes
+    if stream is None:
+        env = MetricsRecorder(loraEnv(N, normalize_obs=normalize_obs))
+        state = env.set_nodes(n_nodes)
+        done = False
+    else:
+        env = StreamRecorder(loraEnv(N, normalize_obs=normalize_obs), stream)
+        state = env.resume(n_nodes)
+        done = env.finished
+
+    while not done:
+        # Evaluate model with predict() method, predecimos la acción más recomendada para ese estado
+        action, _state = model.predict(state, deterministic=deterministic)
+        state, reward, done, info = env.step(int(action))
+
+    return env.results(METRICS)
+
+
+def evaluate_model_batched(model, n_nodes, N=None, normalize_obs=False, seed=None, deterministic=True):
+    """
+    Evaluate a trained model on several frontier nodes at once: they are stepped in lockstep by a BatchedLoraEnv
+    and the model is asked once per step for the actions of all of them, instead of once per node and step.
+    Each frontier node gives the same results as evaluate_model(model, n_nodes[k], N[k]) with the same actions.
+    :param model: SB3 model or numpyPolicy.NumpyPolicy (anything with predict(observations) for a batch)
+    :param n_nodes: list with the number of external nodes of each frontier node
+    :param N: (int or list) number of external nodes each environment is created with, n_nodes by default
+    :param normalize_obs: (bool) the model was trained with normalized observations (sac.py --normalize-obs)
+    :param seed: (int, SeedSequence or None) root seed of the frontier nodes
+    :param deterministic: (bool) as in evaluate_model
+    :return: list with one dict per frontier node as returned by evaluate_model
+    """
+    from batchedLoraEnv import BatchedLoraEnv  # imports stable-baselines3 when it is installed
+    n_nodes = np.asarray(n_nodes, dtype=int)
+    if N is None:
+        N = n_nodes
+    env = BatchedLoraEnv(len(n_nodes), N, normalize_obs=normalize_obs, seed=seed, auto_reset=False)
+    observations = env.set_nodes(n_nodes)
+    lengths = np.zeros(len(n_nodes), dtype=int)
+    running = np.ones(len(n_nodes), dtype=bool)
+    steps = []
+
+    while running.any():
+        actions, _states = model.predict(observations, deterministic=deterministic)
+        observations, rewards, dones, infos = env.step(actions)
+        # One (metric, frontier node) array per step, in the order of METRICS
+        steps.append(np.stack([env.get_pdr(), env.get_prr(), env.get_energy(), env.get_ber()]))
+        lengths[running] += 1
+        running &= ~dones
+
+    values = np.stack(steps)
+    return [{metric: values[:lengths[k], i, k] for i, metric in enumerate(METRICS)} for k in range(len(n_nodes))]
+
+
+def save_results(results, n_nodes, label, store=None):
+    """
+    Save the metrics in the result store read by plot.py
+    :param results: dict returned by evaluate_fixed_action or evaluate_model
+    :param n_nodes: (int) number of external nodes
+    :param label: SF index (action + 1) for fixed actions
+    :param store: ResultStore, results/store by default
+    """
+    if store is None:
+        store = ResultStore()
+    store.put_results(results, n_nodes, label)
+
+
+def main():
+    # Fixed action (a6, SF = 12) with 20 external nodes
+    n_nodes = 20
+    action = 5
+    results = evaluate_fixed_action(n_nodes, action)
+    print(len(results['energy']))
+    #battery_life = count * env.T / (60*24*365)  # cuanto tiempo (años) he estado tx antes de que se me acabe la batería
+    #print(battery_life)
+    save_results(results, n_nodes, action + 1)
+
+    # Trained model, e.g., SAC and TD3 can be tested as well.
+    # We need to check in the webpage of SB3 whether they are compatible with the kind of observation and action we are working with.
+    #from stable_baselines3 import PPO
+    #model = PPO.load("logs/best_model.zip")  # para cargar modelo que se haya generado en el solver
+    #save_results(evaluate_model(model, n_nodes), n_nodes, 'model')
+
+
+if __name__ == '__main__':
+    main()
 
 # Load variables and run the frontier node n iterations while taking recommended actions.
 # Collect data of interest and save in files
 
 # It is very useful to save the data in some files, to later load them and plot in another script.
-# This way you save a lot ot time while plotting, since you don't have to wait until the evaluation is done to plot.
\ No newline at end of file
+# This way you save a lot ot time while plotting, since you don't have to wait until the evaluation is done to plot.
@@ -1,147 +1,202 @@
 from gym import Env, spaces
-import numpy.random
-from gym import spaces
 import numpy as np
-import numpy.ma as ma
 import math
-import random
-from matplotlib import pyplot as plt
-from matplotlib.patches import Circle, Wedge, Polygon, Ellipse, Rectangle
-from matplotlib.collections import PatchCollection
-import matplotlib.patches as matpatches
-import matplotlib.image as mpimg
-from sympy import Point, Polygon
-from shapely.geometry.polygon import LinearRing, Polygon
-from math import dist
-from scipy import stats
-from matplotlib.offsetbox import TextArea, DrawingArea, OffsetImage, AnnotationBbox
-
-# Constants used through the training env
-T = 600  # seconds
-BW = 125  # KHz
-TDC = 1 / 100  # 1%
-Q = 0.051  # Seconds
-Q_MAX = 3600*TDC/Q
-QR = T*TDC/Q
-PACKET_SIZE = 26*8  # Bits
-CAPACITY = 6.45  # Ah
-VOLTAGE = 3.6  # V
-CUT_OFF_VOLTAGE = 2.2  # V
-MAX_BATTERY_LEVEL = CAPACITY * (VOLTAGE-CUT_OFF_VOLTAGE) * 3600  # J
-
-# Allowed actions (configurations)
-ALL_ACTIONS = {
-    "a1": {'CR': 4 / 5, 'SF': 7, 'alpha': -30.2580, 'beta': 0.2857, 'TXR': 3410, 'SNR': -7.5},
-    "a2": {'CR': 4 / 5, 'SF': 8, 'alpha': -77.1002, 'beta': 0.2993, 'TXR': 1841, 'SNR': -10},
-    "a3": {'CR': 4 / 5, 'SF': 9, 'alpha': -244.6424, 'beta': 0.3223, 'TXR': 1015, 'SNR': -12.5},
-    "a4": {'CR': 4 / 5, 'SF': 10, 'alpha': -725.9556, 'beta': 0.3340, 'TXR': 507, 'SNR': -15},
-    "a5": {'CR': 4 / 5, 'SF': 11, 'alpha': -2109.8064, 'beta': 0.3407, 'TXR': 253, 'SNR': -17.5},
-    "a6": {'CR': 4 / 5, 'SF': 12, 'alpha': -4452.3653, 'beta': 0.2217, 'TXR': 127, 'SNR': -20},
-    "a7": {'CR': 4 / 7, 'SF': 7, 'alpha': -105.1966, 'beta': 0.3746, 'TXR': 2663, 'SNR': -7.5},
-    "a8": {'CR': 4 / 7, 'SF': 8, 'alpha': -289.8133, 'beta': 0.3756, 'TXR': 1466, 'SNR': -10},
-    "a9": {'CR': 4 / 7, 'SF': 9, 'alpha': -1114.3312, 'beta': 0.3969, 'TXR': 816, 'SNR': -12.5},
-    "a10": {'CR': 4 / 7, 'SF': 10, 'alpha': -4285.4440, 'beta': 0.4116, 'TXR': 408, 'SNR': -15},
-    "a11": {'CR': 4 / 7, 'SF': 11, 'alpha': -20771.6945, 'beta': 0.4332, 'TXR': 204, 'SNR': -17.5},
-    "a12": {'CR': 4 / 7, 'SF': 12, 'alpha': -98658.1166, 'beta': 0.4485, 'TXR': 102, 'SNR': -20}
-}
-def discard_lowest_g_packets(to_transmit, to_transmit_priorities, max_packets):
+import time
+
+# Constants and physics used through the training env
+from loraPhy import T, BW, TDC, Q, Q_MAX, QR, PACKET_SIZE, CAPACITY, VOLTAGE, CUT_OFF_VOLTAGE, MAX_BATTERY_LEVEL, \
+    ALL_ACTIONS, action_table, packet_reception_rate, duty_cycle_cost, step_reward
+
+
+def discard_lowest_g_packets(to_transmit, to_transmit_priorities, max_packets, out=None, work=None):
     """
     If the number of packets to transmit is higher than max allowed,
     then transmit only max allowed and calculate metrics (PDR, PRR, etc.)
-    This is done by removing first those with the lowest priority.
+    This is done by removing first those with the lowest priority and, within a priority, those with the lowest id.
+    The last axis holds the nodes; any leading axes are a batch of frontier nodes handled at once.
     :param to_transmit: array of nodes that want to transmit, e.g., [1 0 1 1] => nodes with id 1, 3 and 4 transmit
     :param to_transmit_priorities: like to_transmit but including priorities (1,2,3). e.g., [2 0 3 1]
-    :param max_packets: max number of packets according to configuration selected with action
+    :param max_packets: max number of packets according to configuration selected with action,
+      a scalar or one value per frontier node of the batch
+    :param out: optional array shaped like to_transmit where the result is written
+    :param work: optional (bool array, int array) shaped like to_transmit, scratch space of a single frontier node.
+      Together with out, nothing is allocated
     :return: transmitted messages, e.g., [0 0 1 1] => nodes with id 3 and 4 transmit
     """
-    transmitted = np.copy(to_transmit)
-    to_remove = sum(to_transmit) - max_packets
+    if out is None:
+        transmitted = np.copy(to_transmit)
+    else:
+        transmitted = out
+        np.copyto(transmitted, to_transmit)
+    to_transmit_priorities = np.asarray(to_transmit_priorities)
+    if transmitted.ndim == 1:
+        # A single frontier node: the first ids of each priority are removed
+        if work is None:
+            work = (np.empty(transmitted.shape, dtype=bool), np.empty(transmitted.shape, dtype=int))
+        candidates, position = work
+        # One packet is removed at a time while to_remove > 0, so ceil(to_remove) packets are removed in total
+        to_remove = math.ceil(np.sum(to_transmit) - max_packets)
+        for g in [1, 2, 3]:
+            if to_remove <= 0:
+                break
+            np.equal(to_transmit_priorities, g, out=candidates)
+            count = np.count_nonzero(candidates)
+            if count > to_remove:
+                # Only the packets up to the to_remove-th one of priority g
+                np.copyto(position, candidates)
+                np.cumsum(position, out=position)  # 1, 2, ... for the packets of priority g in id order
+                last = np.searchsorted(position, to_remove)
+                np.putmask(transmitted[:last + 1], candidates[:last + 1], 0)
+            else:
+                np.putmask(transmitted, candidates, 0)
+            to_remove -= count
+        return transmitted
+    to_remove = np.ceil(np.sum(to_transmit, axis=-1) - np.asarray(max_packets))[..., np.newaxis]
     for g in [1, 2, 3]:  # Remove first low priorities, then high ones if still needed
-        for i, v in enumerate(to_transmit_priorities):
-            if to_remove > 0:
-                if v == g:
-                    transmitted[i] = 0
-                    to_remove -= 1
+        candidates = to_transmit_priorities == g
+        position = np.cumsum(candidates, axis=-1)  # 1, 2, ... for the packets of priority g in id order
+        transmitted[candidates & (position <= to_remove)] = 0
+        to_remove = to_remove - position[..., -1:]
     return transmitted
 
-def heaviside(a, b):
-    if a > b:
-        return 1
-    else:
-        return -1
+
+# Stages of loraEnv.step timed when profiling, in the order of profile_report()
+PROFILE_STAGES = ('priorities', 'discard', 'reception', 'energy', 'observation', 'logging')
+
+
+def spawn_seeds(seed, num_envs):
+    """
+    Independent seeds for num_envs environments, e.g. the workers of a SubprocVecEnv.
+    The i-th seed only depends on seed and i, so environment i sees the same random numbers whatever the number
+    of environments is.
+    :param seed: (int, SeedSequence or None) root seed
+    :return: list of num_envs numpy.random.SeedSequence
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return [np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key + (i,), pool_size=seed.pool_size)
+            for i in range(num_envs)]
+
+
+def make_rngs(seed):
+    """
+    Random generators of one environment: one for the number of nodes drawn by reset() and one for the priorities
+    drawn by step(). The priorities only choose which packets are discarded, never how many, so keeping them in their
+    own stream lets BatchedLoraEnv skip them and still match loraEnv.
+    :param seed: (int, SeedSequence or None) seed of the environment
+    :return: (episode generator, priority generator)
+    """
+    episode_seed, priority_seed = spawn_seeds(seed, 2)
+    return np.random.default_rng(episode_seed), np.random.default_rng(priority_seed)
 
 
 class loraEnv(Env):
     """Lora Environment that follows gym interface"""
 
-    def __init__(self, N):  # Method to initialize the attributes of the object we create
+    def __init__(self, N, verbose=0, trace=None, normalize_obs=False, seed=None, profile=False):  # Method to initialize the attributes of the object we create
+        """
+        :param N: (int) number of external nodes
+        :param verbose: (int) 0 steps silently, 1 prints the metrics of every step
+          and 2 also prints the per-node arrays (transmissions and priorities)
+        :param trace: (callable) optional sink called at the end of every step with a dict
+          holding action, n, q, e, pdr, prr, ber, e_pkt, airtime and reward, e.g. ``records.append``
+        :param normalize_obs: (bool) observe [q / Q_MAX, e / MAX_BATTERY_LEVEL, n / N] as float32 instead of
+          [q, e, n] as float64
+        :param seed: (int, SeedSequence or None) seed of the random generators of this environment (see make_rngs),
+          use spawn_seeds to get the seeds of several environments
+        :param profile: (bool) time every stage of step() (see profile_report). When False the only cost
+          is one attribute check per stage
+        """
         super(loraEnv, self).__init__()
 
         # Class attributes
         self.N = N
-        self.min = 0
-        self.max = max(max(Q_MAX, MAX_BATTERY_LEVEL), self.N)
+        self.verbose = verbose
+        self.trace = trace
+        self.normalize_obs = normalize_obs
+        self.seed(seed)
+        self.profile = profile
+        self.reset_profile()
+        self.min = np.zeros(3)
+        self.max = np.array([Q_MAX, MAX_BATTERY_LEVEL, self.N], dtype=np.float64)
         self.q = Q_MAX
         self.e = MAX_BATTERY_LEVEL
         self.n = self.N
 
-        # Arrays to calculate pdr
-        self.packets_attempted = np.zeros(self.n)  # to store the sum of the transmissions attempted by the external nodes
-        self.packets_transmitted = np.zeros(self.n)  # to store the sum of the transmissions made by the external nodes
+        # Per-node arrays, allocated for capacity nodes and reused by every step (see _set_population)
+        self.capacity = 0
+        self._set_population(self.n)
 
         # Define action and observation space
         # They must be gym.spaces objects
         self.action_space = spaces.Discrete(12)
-        self.observation_space = spaces.Box(low=self.min, high=self.max, shape=(3,), dtype=np.float64)
+        if self.normalize_obs:
+            self.observation_space = spaces.Box(low=0, high=1, shape=(3,), dtype=np.float32)
+        else:
+            self.observation_space = spaces.Box(low=self.min, high=self.max, shape=(3,), dtype=np.float64)
         self.state = [self.q, self.e, self.n]
 
         self.pdr = -1
         self.prr = []
         self.ber = 0
 
+        # Physics of each action for this N, as plain Python tuples indexed by action
+        self.action_table = action_table(self.N)
+        self.configs = self.action_table.tolist()
+
     def step(self, action):
         # Called to take an action with the environment, it returns the next observation,
 
+        if self.profile:
+            self._lap_start = time.perf_counter()
         reward = -1  # by defect
 
-        # Transform action (int) in the desired config and create variables (CR, SF, alpha, etc)
-        config = list(ALL_ACTIONS.values())[action]
-        cr = config.get("CR")
-        sf = config.get("SF")
-        alpha = config.get("alpha")
-        beta = config.get("beta")
-        txr = config.get("TXR")
-        snr = config.get("SNR")
+        # Physics of the selected configuration (see action_table)
+        cr, sf, txr, ber, t, e_pkt, battery_life, max_packets = self.configs[action]
 
         # Create an array with transmissions of external nodes with Bernoulli distribution
         # Create an array with random priorities
-        to_transmit = np.ones(self.n).astype(int)
-        print('To_transmit: ' + str(to_transmit))
-        self.packets_attempted = (self.packets_attempted + to_transmit).astype(int)
-        print('Packets_attempted: ' + str(self.packets_attempted))
-        print('To_transmit: ' + str(to_transmit))
-
-        priorities = np.random.randint(low=1, high=4, size=self.n, dtype=int)
-        print('Priorities: ' + str(priorities))
-
-        to_transmit_priorities = np.multiply(to_transmit, priorities)
-        print('To_transmit_priorities: ' + str(to_transmit_priorities))
-
-        # If Q = QMAX (transmit only during 1% of T), there is energy enough,
+        # Every array is a preallocated buffer updated in place, nothing is allocated per step
+        to_transmit = self.to_transmit
+        np.add(self.packets_attempted, to_transmit, out=self.packets_attempted)
+
+        # floor(3u) + 1 with u uniform in [0, 1), the float to int copy truncates
+        priorities = self.priorities
+        self.priority_rng.random(out=self.uniform)
+        np.multiply(self.uniform, 3, out=self.uniform)
+        np.add(self.uniform, 1, out=self.uniform)
+        np.copyto(priorities, self.uniform, casting='unsafe')
+
+        to_transmit_priorities = np.multiply(to_transmit, priorities, out=self.to_transmit_priorities)
+        if self.profile:
+            self._lap('priorities')
+        if self.verbose >= 2:
+            print('To_transmit: ' + str(to_transmit))
+            print('Packets_attempted: ' + str(self.packets_attempted))
+            print('Priorities: ' + str(priorities))
+            print('To_transmit_priorities: ' + str(to_transmit_priorities))
+            if self.profile:
+                self._lap('logging')
+
+        # If there is duty-cycle budget left (transmit only during 1% of T), there is energy enough,
         # and the frontier node has to transmit, that is to say, self.tx is 1,
         # then out packet is transmitted together with the packets received from external nodes
-        if MAX_BATTERY_LEVEL > 0:
+        if self.e > 0 and self.q > 0:
             max_packages = self.n/2
             #max_packages = txr * Q * Q_MAX / PACKET_SIZE + 1  # Max number of packets agent node can transmit
 
-            if sum(to_transmit) > max_packages:
-                transmitted = discard_lowest_g_packets(to_transmit, to_transmit_priorities, max_packages)
+            n_to_transmit = np.sum(to_transmit)
+            if n_to_transmit > max_packages:
+                transmitted = discard_lowest_g_packets(to_transmit, to_transmit_priorities, max_packages,
+                                                       out=self.transmitted, work=(self.candidates, self.position))
             else:
                 transmitted = to_transmit
+            n_transmitted = np.sum(transmitted)
+            if self.profile:
+                self._lap('discard')
 
             # PDR local
-            self.pdr = np.sum(transmitted) / np.sum(to_transmit)
-            print('PDR local: ' + str(self.pdr))
+            self.pdr = n_transmitted / n_to_transmit
 
             """
             # PDR global
@@ -153,46 +208,53 @@ class loraEnv(Env):
             """
 
             # PRR
-            self.ber = pow(10, alpha * math.exp(beta * snr))
-            ber = 0.5 * Q * (math.sqrt(2 * self.N) - math.sqrt(1.386 * sf + 1.154))
-            self.prr = (1 - self.ber) ** (PACKET_SIZE * sum(transmitted))
-            print('PRR: ' + str(self.prr))
+            self.ber = ber
+            self.prr = packet_reception_rate(self.ber, n_transmitted)
+            if self.profile:
+                self._lap('reception')
 
             # Update q value
-            rest_action = ((PACKET_SIZE * sum(transmitted) / txr) / Q)
+            rest_action = duty_cycle_cost(n_transmitted, txr)
             self.q = self.q - rest_action
 
             # ENERGY
-            payload = self.N * PACKET_SIZE / 8  # bytes
-            n_p = 8
-            t_pr = (4.25 + n_p) * pow(2, sf) / BW
-            p_sy = 8 + max(((8 * payload - 4 * sf + 44 - 20 * 1) / (4 * (sf - 2 * 1))) * (cr + 4), 0)
-            t_pd = p_sy * pow(2, sf) / BW
-            t = t_pr + t_pd
-            idle = 1.05833  # J
-            rx = 0.0295488  # J
-            sleep = 0.0300672  # J
-            print('Self.e antes: ' + str(self.e))
-            e_pkt = 0.0924 * t + idle + rx + sleep  # J or Ws using Pt = 13 dBm
-            battery_life = MAX_BATTERY_LEVEL * T / (e_pkt * 60 * 24 * 365)
+            e_before = self.e
             self.e = self.e - e_pkt
-            print('Self.e después: ' + str(self.e))
 
-            print('Energía por paquete: ' + str(e_pkt) + ' J')
-            print('Duración de la batería: ' + str(battery_life) + ' años')
+            # The episode ends when the battery is empty or the transmission overdraws the duty-cycle budget,
+            # otherwise QR is replenished for the next period
+            if self.e <= 0 or self.q <= 0:
+                self.e = max(self.e, 0)
+                self.q = max(self.q, 0)
+            else:
+                self.q = min(self.q + QR, Q_MAX)
 
             # reward
-            reward = 0.4 * heaviside(self.prr, 0.8) + 0.4 * heaviside(self.pdr, 0.8) - 0.2 * heaviside(e_pkt, 437.82)
-            print('Recompensa: ' + str(reward))
-
-        # Not transmit
+            # Python floats, NumPy scalars would make this line the slowest of the step
+            reward = step_reward(float(self.prr), float(self.pdr), float(e_pkt))
+            if self.profile:
+                self._lap('energy')
+
+            if self.verbose >= 1:
+                print('PDR local: ' + str(self.pdr))
+                print('PRR: ' + str(self.prr))
+                print('Self.e antes: ' + str(e_before))
+                print('Self.e después: ' + str(self.e))
+                print('Energía por paquete: ' + str(e_pkt) + ' J')
+                print('Duración de la batería: ' + str(battery_life) + ' años')
+                print('Recompensa: ' + str(reward))
+                if self.profile:
+                    self._lap('logging')
+
+        # Not transmit (the episode is over)
         else:
             # Calculate metrics
             # PDR
-            self.packets_attempted = np.add(self.packets_attempted, to_transmit)
+            np.add(self.packets_attempted, to_transmit, out=self.packets_attempted)
             self.packets_transmitted = self.packets_transmitted
             self.pdr = np.sum(self.packets_transmitted) / np.sum(self.packets_attempted)
             self.prr = 0
+            n_transmitted = 0
 
             # Update q value
             # self.q = self.q + QR
@@ -201,14 +263,61 @@ class loraEnv(Env):
             self.e = self.e
 
             reward = -1
+            if self.profile:
+                self._lap('reception')
 
         # update state
-        self.state = [self.q, self.e, self.n]
-        observation = np.array(self.state)
-        info = {}
-        done = False
+        observation = self._observe()
+        # Packets of each priority class (1,2,3) that were not transmitted, the lowest priorities go first
+        removed = int(np.sum(to_transmit) - n_transmitted)
+        dropped = []
+        for g in [1, 2, 3]:
+            count = int(np.count_nonzero(np.equal(to_transmit_priorities, g, out=self.candidates)))
+            dropped.append(min(count, removed))
+            removed -= dropped[-1]
+        info = {'pdr': self.pdr, 'prr': self.prr, 'ber': self.ber, 'e_pkt': e_pkt, 'airtime': t, 'energy': self.e,
+                'dropped': tuple(dropped)}
+        done = self.e <= 0 or self.q <= 0
+        if self.profile:
+            self._lap('observation')
+        if self.trace is not None:
+            self.trace({'action': action, 'n': self.n, 'q': self.q, 'e': self.e, 'pdr': self.pdr, 'prr': self.prr,
+                        'ber': self.ber, 'e_pkt': e_pkt, 'airtime': t, 'reward': reward})
+            if self.profile:
+                self._lap('logging')
         return observation, reward, done, info
 
+    def _lap(self, stage):
+        # Time since the previous lap goes to stage
+        now = time.perf_counter()
+        self.profile_seconds[stage] += now - self._lap_start
+        self.profile_calls[stage] += 1
+        self._lap_start = now
+
+    def reset_profile(self):
+        """Forget the times recorded so far"""
+        self.profile_seconds = dict.fromkeys(PROFILE_STAGES, 0.0)
+        self.profile_calls = dict.fromkeys(PROFILE_STAGES, 0)
+        self._lap_start = 0.0
+
+    def profile_report(self):
+        """
+        Cumulative time and number of calls of every stage of step() since the environment was created
+        (or reset_profile was called), when it is created with profile=True.
+        priorities: per-node transmissions and random priorities; discard: discard_lowest_g_packets;
+        reception: PDR and PRR (the BER of every action is precomputed by action_table); energy: duty-cycle
+        budget, battery and reward; observation: observation and info; logging: verbose prints and trace
+        :return: (str) one line per stage
+        """
+        total = sum(self.profile_seconds.values())
+        lines = ['stage          calls    total ms    us/call      %']
+        for stage in PROFILE_STAGES:
+            seconds, calls = self.profile_seconds[stage], self.profile_calls[stage]
+            lines.append(f'{stage:12s} {calls:7d} {seconds * 1e3:11.3f} {seconds / max(calls, 1) * 1e6:10.2f}'
+                         f' {100 * seconds / total if total else 0:6.1f}')
+        lines.append(f'{"total":12s} {"":7s} {total * 1e3:11.3f}')
+        return '\n'.join(lines)
+
     def get_pdr(self):
         return self.pdr
 
@@ -221,23 +330,78 @@ class loraEnv(Env):
     def get_ber(self):
         return self.ber
 
-    def reset(self):
+    def seed(self, seed=None):
+        """
+        Restart the random generators of the environment
+        :param seed: (int, SeedSequence or None) see make_rngs
+        """
+        self.rng, self.priority_rng = make_rngs(seed)
+        return [seed]
+
+    def reset(self, seed=None):
+        """
+        Start a new episode with a random number of nodes between 1 and N
+        :param seed: (int, SeedSequence or None) if given, the random generators are restarted with it first
+        """
+        if seed is not None:
+            self.seed(seed)
         self.q = Q_MAX  # 706 at the beginning
         self.e = MAX_BATTERY_LEVEL
-        self.n = np.random.randint(1, self.N)
-        self.packets_attempted = np.zeros((1, self.n))
-        self.packets_transmitted = np.zeros((1, self.n))
+        self.n = int(self.rng.integers(1, self.N, endpoint=True))
+        self._set_population(self.n)
         self.pdr = -1
         self.prr = []
-        self.state = [self.q, self.e, self.n]
-        observation = np.array(self.state)
-        return observation
+        return self._observe()
 
     def set_nodes(self, N):
         self.q = Q_MAX  # 706 at the beginning
         self.e = MAX_BATTERY_LEVEL
         self.n = N
+        self._set_population(self.n)
+        return self._observe()
+
+    def set_state(self, q, e, n):
+        """
+        Continue an episode from a saved state, e.g. an evaluation resumed by metricsRecorder.StreamRecorder
+        :param q: duty-cycle budget
+        :param e: battery level (J)
+        :param n: (int) number of external nodes
+        :return: observation of that state
+        """
+        self.set_nodes(int(n))
+        self.q = q
+        self.e = e
+        return self._observe()
+
+    def _set_population(self, n):
+        """
+        Point the per-node arrays to the first n entries of buffers allocated for max(N, n) nodes,
+        so they are only allocated again if set_nodes asks for more nodes than ever before
+        """
+        if n > self.capacity:
+            self.capacity = max(self.N, n)
+            self._buffers = {
+                'to_transmit': np.ones(self.capacity, dtype=int),
+                # to store the sum of the transmissions attempted and made by the external nodes
+                'packets_attempted': np.zeros(self.capacity, dtype=int),
+                'packets_transmitted': np.zeros(self.capacity, dtype=int),
+                'uniform': np.zeros(self.capacity),
+                'priorities': np.zeros(self.capacity, dtype=int),
+                'to_transmit_priorities': np.zeros(self.capacity, dtype=int),
+                'transmitted': np.zeros(self.capacity, dtype=int),
+                'candidates': np.zeros(self.capacity, dtype=bool),
+                'position': np.zeros(self.capacity, dtype=int),
+            }
+        for name, buffer in self._buffers.items():
+            setattr(self, name, buffer[:n])
+        self.packets_attempted.fill(0)
+        self.packets_transmitted.fill(0)
+
+    def _observe(self):
         self.state = [self.q, self.e, self.n]
-        observation = np.array(self.state)
-        return observation
+        if self.normalize_obs:
+            # A new array every time: VecEnvs keep the last observation of an episode (terminal_observation)
+            # after calling reset()
+            return np.array([self.q / Q_MAX, self.e / MAX_BATTERY_LEVEL, self.n / self.N], dtype=np.float32)
+        return np.array(self.state)
 
@@ -0,0 +1,159 @@
+import numpy as np
+
+# LoRa PHY and energy model of the frontier node, shared by loraEnv, plot and evaluation.
+# Every function broadcasts over its arguments and the per-action values are compiled once
+# into NumPy arrays (ACTION_*, action_table), so batched callers can index them directly.
+
+# Constants used through the training env
+# Battery data from https://saft4u.saftbatteries.com/en/iot/simulator/result/4919
+
+# Real battery used: LSH 20
+# Project parameters
+#
+#     Environment: Smart Agriculture & Environmental Preservation
+#     Application: Air quality monitoring
+#     Location: Outdoor
+#     Geographic zone: Europe
+#     Connectivity solution: LoRa
+#     Data transmission: Every 10'
+#     Life duration: 5 years
+#     Cut-off Voltage: 2,2 V
+#
+# Consumption profile
+#
+#     Maximal peak current: 50 mA
+#     Yearly consumption: 1,29 Ah
+#     Total consumption: 6.45 Ah
+#
+T = 600  # seconds
+BW = 125  # KHz
+TDC = 1 / 100  # 1%
+Q = 0.051  # Seconds
+Q_MAX = 3600*TDC/Q
+QR = T*TDC/Q
+PACKET_SIZE = 26*8  # Bits
+CAPACITY = 6.45  # Ah
+VOLTAGE = 3.6  # V
+CUT_OFF_VOLTAGE = 2.2  # V
+MAX_BATTERY_LEVEL = CAPACITY * (VOLTAGE-CUT_OFF_VOLTAGE) * 3600  # J
+
+# Allowed actions (configurations), SNR in dB
+ALL_ACTIONS = {
+    "a1": {'CR': 4 / 5, 'SF': 7, 'alpha': -30.2580, 'beta': 0.2857, 'TXR': 3410, 'SNR': -7.5},
+    "a2": {'CR': 4 / 5, 'SF': 8, 'alpha': -77.1002, 'beta': 0.2993, 'TXR': 1841, 'SNR': -10},
+    "a3": {'CR': 4 / 5, 'SF': 9, 'alpha': -244.6424, 'beta': 0.3223, 'TXR': 1015, 'SNR': -12.5},
+    "a4": {'CR': 4 / 5, 'SF': 10, 'alpha': -725.9556, 'beta': 0.3340, 'TXR': 507, 'SNR': -15},
+    "a5": {'CR': 4 / 5, 'SF': 11, 'alpha': -2109.8064, 'beta': 0.3407, 'TXR': 253, 'SNR': -17.5},
+    "a6": {'CR': 4 / 5, 'SF': 12, 'alpha': -4452.3653, 'beta': 0.2217, 'TXR': 127, 'SNR': -20},
+    "a7": {'CR': 4 / 7, 'SF': 7, 'alpha': -105.1966, 'beta': 0.3746, 'TXR': 2663, 'SNR': -7.5},
+    "a8": {'CR': 4 / 7, 'SF': 8, 'alpha': -289.8133, 'beta': 0.3756, 'TXR': 1466, 'SNR': -10},
+    "a9": {'CR': 4 / 7, 'SF': 9, 'alpha': -1114.3312, 'beta': 0.3969, 'TXR': 816, 'SNR': -12.5},
+    "a10": {'CR': 4 / 7, 'SF': 10, 'alpha': -4285.4440, 'beta': 0.4116, 'TXR': 408, 'SNR': -15},
+    "a11": {'CR': 4 / 7, 'SF': 11, 'alpha': -20771.6945, 'beta': 0.4332, 'TXR': 204, 'SNR': -17.5},
+    "a12": {'CR': 4 / 7, 'SF': 12, 'alpha': -98658.1166, 'beta': 0.4485, 'TXR': 102, 'SNR': -20}
+}
+
+
+def bit_error_rate(alpha, beta, snr):
+    """BER of a configuration from its fitted alpha and beta and its SNR (dB)"""
+    return np.power(10, alpha * np.exp(beta * snr))
+
+
+def packet_reception_rate(ber, n_packets):
+    """Probability that a frame with n_packets packets is received without bit errors"""
+    return (1 - ber) ** (PACKET_SIZE * n_packets)
+
+
+def time_on_air(sf, cr, n_nodes):
+    """
+    Airtime (ms) of the frame with the packets of n_nodes external nodes. Broadcasts over its arguments,
+    e.g. time_on_air(ACTION_SF[:, None], ACTION_CR[:, None], N) gives the airtime of every action for every N.
+    """
+    payload = np.asarray(n_nodes) * PACKET_SIZE / 8  # bytes
+    n_p = 8
+    t_pr = (4.25 + n_p) * np.power(2.0, sf) / BW
+    p_sy = 8 + np.maximum(((8 * payload - 4 * sf + 44 - 20 * 1) / (4 * (sf - 2 * 1))) * (cr + 4), 0)
+    t_pd = p_sy * np.power(2.0, sf) / BW
+    return t_pr + t_pd
+
+
+def duty_cycle_cost(n_packets, txr):
+    """Duty-cycle budget (in units of Q, as the q state of loraEnv) spent sending n_packets at txr bps"""
+    return (PACKET_SIZE * n_packets / txr) / Q
+
+
+def duty_cycle_max_packets(txr):
+    """Max number of packets per frame that the full duty-cycle budget Q_MAX allows at txr bps"""
+    return txr * Q * Q_MAX / PACKET_SIZE + 1
+
+
+def packet_energy(t):
+    """Energy (J) spent by the frontier node per period when its frame lasts t ms"""
+    idle = 1.05833  # J
+    rx = 0.0295488  # J
+    sleep = 0.0300672  # J
+    return 0.0924 * t + idle + rx + sleep  # J or Ws using Pt = 13 dBm
+
+
+def battery_life_years(e_pkt, max_battery_level=MAX_BATTERY_LEVEL, t=T):
+    """Years a full battery lasts spending e_pkt J every period of t seconds"""
+    return max_battery_level * t / (e_pkt * 60 * 24 * 365)
+
+
+def heaviside(a, b):
+    """1 where a > b, -1 elsewhere"""
+    return 2 * (a > b) - 1
+
+
+def step_reward(prr, pdr, e_pkt):
+    """Reward of a step of the frontier node: high PRR and PDR (above 0.8) and a low e_pkt (up to 437.82 J)"""
+    return 0.4 * heaviside(prr, 0.8) + 0.4 * heaviside(pdr, 0.8) - 0.2 * heaviside(e_pkt, 437.82)
+
+
+# Columns of ALL_ACTIONS as arrays indexed by action
+ACTION_CR = np.array([config.get("CR") for config in ALL_ACTIONS.values()])
+ACTION_SF = np.array([config.get("SF") for config in ALL_ACTIONS.values()])
+ACTION_TXR = np.array([config.get("TXR") for config in ALL_ACTIONS.values()], dtype=np.float64)
+ACTION_BER = bit_error_rate(np.array([config.get("alpha") for config in ALL_ACTIONS.values()]),
+                            np.array([config.get("beta") for config in ALL_ACTIONS.values()]),
+                            np.array([config.get("SNR") for config in ALL_ACTIONS.values()], dtype=np.float64))
+
+# Physics of every action, see action_table()
+ACTION_TABLE_DTYPE = np.dtype([('cr', np.float64), ('sf', np.int64), ('txr', np.float64), ('ber', np.float64),
+                               ('airtime', np.float64), ('e_pkt', np.float64), ('battery_life', np.float64),
+                               ('max_packets', np.float64)])
+_ACTION_TABLES = {}
+
+
+def action_table(n_nodes):
+    """
+    Lookup table with the physics of the 12 actions when the frontier node forwards the packets of n_nodes
+    external nodes. The values only depend on the action and on n_nodes, so they are computed once and cached.
+    Fields: cr, sf, txr, ber, airtime (ms), e_pkt (J), battery_life (years) and max_packets, the number of packets
+    the duty-cycle budget Q_MAX allows per frame.
+    :param n_nodes: number of external nodes (int) or 1-d array of them
+    :return: structured array of ACTION_TABLE_DTYPE with shape (12,), or (12, len(n_nodes)) for an array
+    """
+    if np.ndim(n_nodes) > 0:
+        return _build_action_table(n_nodes)
+    if n_nodes not in _ACTION_TABLES:
+        table = _build_action_table(n_nodes)
+        table.flags.writeable = False
+        _ACTION_TABLES[n_nodes] = table
+    return _ACTION_TABLES[n_nodes]
+
+
+def _build_action_table(n_nodes):
+    # Actions along the first axis, numbers of nodes (if more than one) along the second one
+    n_nodes = np.asarray(n_nodes)
+    per_action = (slice(None),) + (np.newaxis,) * n_nodes.ndim
+    table = np.zeros(ACTION_SF.shape + n_nodes.shape, dtype=ACTION_TABLE_DTYPE)
+    table['cr'] = ACTION_CR[per_action]
+    table['sf'] = ACTION_SF[per_action]
+    table['txr'] = ACTION_TXR[per_action]
+    table['ber'] = ACTION_BER[per_action]
+    table['airtime'] = time_on_air(ACTION_SF[per_action], ACTION_CR[per_action], n_nodes)
+    table['e_pkt'] = packet_energy(table['airtime'])
+    table['battery_life'] = battery_life_years(table['e_pkt'])
+    table['max_packets'] = duty_cycle_max_packets(ACTION_TXR)[per_action]
+    return table
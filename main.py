@@ -2,7 +2,7 @@ from loraEnv import loraEnv
 def main():
     try:
         print('INICIO')
-        myEnv = loraEnv(20)
+        myEnv = loraEnv(20, verbose=2)
         myEnv.step(5)
         print('FIN')
 
@@ -0,0 +1,162 @@
+import os
+import math
+import numpy as np
+from gym import Wrapper
+from loraPhy import MAX_BATTERY_LEVEL, action_table
+
+# One row per step with the metrics published by loraEnv.step in info, plus the reward
+STEP_DTYPE = np.dtype([('pdr', np.float64), ('prr', np.float64), ('ber', np.float64), ('e_pkt', np.float64),
+                       ('airtime', np.float64), ('energy', np.float64), ('reward', np.float64),
+                       ('dropped', np.int64, (3,))])
+
+# Columns of the float32 rows written by StreamRecorder, q is kept so that a rollout can be resumed
+STREAM_FIELDS = ('pdr', 'prr', 'ber', 'e_pkt', 'airtime', 'energy', 'reward', 'q')
+
+
+def episode_capacity(N):
+    """
+    Upper bound of the number of steps of an episode of loraEnv(N): the battery loses at least the
+    e_pkt of the cheapest action at every step
+    """
+    return int(math.ceil(MAX_BATTERY_LEVEL / action_table(N)['e_pkt'].min())) + 1
+
+
+class MetricsRecorder(Wrapper):
+    """
+    Keep the metrics that loraEnv.step publishes in info in a preallocated ring buffer of STEP_DTYPE rows.
+    Each step writes one row, and once the buffer is full the oldest rows are overwritten.
+    The recorded values are read per metric as NumPy arrays (see values), so no getter is polled and no
+    list is grown while stepping.
+
+    :param env: loraEnv, possibly wrapped
+    :param capacity: (int) number of steps kept, enough for a whole episode by default (see episode_capacity)
+    """
+
+    def __init__(self, env, capacity=None):
+        super(MetricsRecorder, self).__init__(env)
+        if capacity is None:
+            capacity = episode_capacity(env.unwrapped.N)
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=STEP_DTYPE)
+        self.count = 0  # steps recorded since the last clear()
+
+    def step(self, action):
+        observation, reward, done, info = self.env.step(action)
+        self.buffer[self.count % self.capacity] = (info['pdr'], info['prr'], info['ber'], info['e_pkt'],
+                                                   info['airtime'], info['energy'], reward, info['dropped'])
+        self.count += 1
+        return observation, reward, done, info
+
+    def clear(self):
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def values(self, metric):
+        """
+        Recorded values of one metric (a field of STEP_DTYPE), oldest first.
+        A view of the buffer while it has not wrapped around, a copy otherwise.
+        """
+        column = self.buffer[metric]
+        if self.count <= self.capacity:
+            return column[:self.count]
+        start = self.count % self.capacity
+        return np.concatenate((column[start:], column[:start]))
+
+    def results(self, metrics=('pdr', 'prr', 'energy', 'ber')):
+        """Dict of metric => recorded values, as returned by evaluation.evaluate_model"""
+        return {metric: self.values(metric) for metric in metrics}
+
+
+class StreamRecorder(Wrapper):
+    """
+    Write the metrics of every step to disk while the rollout runs, so that a rollout of any length
+    takes constant memory and a crash only loses the current chunk.
+    Each step fills one float32 row of STREAM_FIELDS in a preallocated chunk of chunk_size rows; full chunks are
+    appended to ``<path>.bin``. After every chunk the state of the environment (q, e, n) and the number of rows
+    written are saved to ``<path>.state.npy``, so resume() can continue the rollout from there.
+    The rows written so far can be read at any time with read_stream(path), even while the rollout runs.
+
+    :param env: loraEnv, possibly wrapped
+    :param path: (str) path of the files without extension
+    :param chunk_size: (int) rows per chunk
+    """
+
+    def __init__(self, env, path, chunk_size=4096):
+        super(StreamRecorder, self).__init__(env)
+        self.path = path
+        self.data_path = path + '.bin'
+        self.state_path = path + '.state.npy'
+        self.chunk = np.zeros((chunk_size, len(STREAM_FIELDS)), dtype=np.float32)
+        self.pending = 0  # rows of chunk not written yet
+        self.rows = 0  # rows in the data file
+        self.finished = False  # the episode of the saved state is over
+
+    def resume(self, n_nodes):
+        """
+        Start the rollout, from the saved state if there is one, otherwise from a full battery with n_nodes
+        external nodes (see loraEnv.set_nodes). Rows written after the saved state, if any, are dropped.
+        :return: observation
+        """
+        env = self.env.unwrapped
+        self.pending = 0
+        if os.path.exists(self.state_path):
+            rows, q, e, n, finished = np.load(self.state_path)
+            self.rows, self.finished = int(rows), bool(finished)
+            with open(self.data_path, 'ab') as f:
+                f.truncate(self.rows * self.chunk.shape[1] * self.chunk.itemsize)
+            return env.set_state(q, e, n)
+        self.rows, self.finished = 0, False
+        open(self.data_path, 'wb').close()
+        observation = self.env.set_nodes(n_nodes)
+        self._save_state()
+        return observation
+
+    def step(self, action):
+        observation, reward, done, info = self.env.step(action)
+        self.chunk[self.pending] = (info['pdr'], info['prr'], info['ber'], info['e_pkt'], info['airtime'],
+                                    info['energy'], reward, self.env.unwrapped.q)
+        self.pending += 1
+        self.finished = done
+        if done or self.pending == len(self.chunk):
+            self.flush()
+        return observation, reward, done, info
+
+    def flush(self):
+        """Append the pending rows to the data file and save the state they lead to"""
+        with open(self.data_path, 'ab') as f:
+            self.chunk[:self.pending].tofile(f)
+        self.rows += self.pending
+        self.pending = 0
+        self._save_state()
+
+    def close(self):
+        self.flush()
+        return self.env.close()
+
+    def results(self, metrics=('pdr', 'prr', 'energy', 'ber')):
+        """Dict of metric => recorded values (read-only memory maps), as returned by evaluation.evaluate_model"""
+        self.flush()
+        return read_stream(self.path, metrics)
+
+    def _save_state(self):
+        # Written to a temporary file first so a crash never leaves a truncated state
+        env = self.env.unwrapped
+        tmp_path = self.path + '.state.tmp.npy'
+        np.save(tmp_path, np.array([self.rows, env.q, env.e, env.n, self.finished], dtype=np.float64))
+        os.replace(tmp_path, self.state_path)
+
+
+def read_stream(path, fields=STREAM_FIELDS):
+    """
+    Rows written by a StreamRecorder so far, without loading them: one read-only memory map per field
+    :param path: (str) path given to the StreamRecorder
+    :return: dict of field => float32 values
+    """
+    data_path = path + '.bin'
+    rows = os.path.getsize(data_path) // (len(STREAM_FIELDS) * 4) if os.path.exists(data_path) else 0
+    if rows == 0:
+        return {field: np.zeros(0, dtype=np.float32) for field in fields}
+    data = np.memmap(data_path, dtype=np.float32, mode='r', shape=(rows, len(STREAM_FIELDS)))
+    return {field: data[:, STREAM_FIELDS.index(field)] for field in fields}
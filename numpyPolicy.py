@@ -0,0 +1,83 @@
+import numpy as np
+
+# Activations of the SB3 MLP policies, by the name of their torch module
+ACTIVATIONS = {
+    'Tanh': np.tanh,
+    'ReLU': lambda x: np.maximum(x, 0),
+    'Identity': lambda x: x,
+}
+
+
+class NumpyPolicy:
+    """
+    Forward pass of the actor of an SB3 MlpPolicy (e.g. PPO or A2C on loraEnv) written with NumPy, so a trained
+    model can be evaluated without torch. It always takes the most likely action, that is, like
+    model.predict(observation, deterministic=True).
+    Build it with export_policy(model) and keep it with save(path) / NumpyPolicy.load(path).
+
+    :param weights: list of (weight, bias) arrays of the linear layers, weight with shape (outputs, inputs) as in torch
+    :param activations: list with the name of the activation after each layer but the last one, see ACTIVATIONS
+    """
+
+    def __init__(self, weights, activations):
+        self.weights = [(np.asarray(w, dtype=np.float32), np.asarray(b, dtype=np.float32)) for w, b in weights]
+        self.activations = list(activations)
+
+    def logits(self, observation):
+        x = np.asarray(observation, dtype=np.float32)
+        for i, (w, b) in enumerate(self.weights):
+            x = x @ w.T + b
+            if i < len(self.activations):
+                x = ACTIVATIONS[self.activations[i]](x)
+        return x
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True):
+        """
+        Same signature as the predict() of SB3 models
+        :param observation: one observation or a batch of them (one per row)
+        :return: (action or array of actions, None)
+        """
+        return np.argmax(self.logits(observation), axis=-1), None
+
+    def save(self, path):
+        arrays = {}
+        for i, (w, b) in enumerate(self.weights):
+            arrays['w' + str(i)] = w
+            arrays['b' + str(i)] = b
+        np.savez(path, activations=np.array(self.activations), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            layers = len([name for name in arrays.files if name.startswith('w')])
+            weights = [(arrays['w' + str(i)], arrays['b' + str(i)]) for i in range(layers)]
+            return cls(weights, [str(name) for name in arrays['activations']])
+
+
+def export_policy(model):
+    """
+    Copy the actor of an SB3 model with an MlpPolicy and a discrete action space into a NumpyPolicy
+    :param model: SB3 model, e.g. PPO.load("logs/best_model.zip")
+    :return: NumpyPolicy
+    """
+    policy = model.policy
+    modules = []
+    # Older SB3 versions have layers shared by the actor and the critic before policy_net
+    if hasattr(policy.mlp_extractor, 'shared_net'):
+        modules += list(policy.mlp_extractor.shared_net)
+    modules += list(policy.mlp_extractor.policy_net)
+    modules.append(policy.action_net)
+
+    weights = []
+    activations = []
+    for module in modules:
+        name = type(module).__name__
+        if name == 'Linear':
+            if len(activations) < len(weights):
+                activations.append('Identity')  # two linear layers in a row
+            weights.append((module.weight.detach().cpu().numpy(), module.bias.detach().cpu().numpy()))
+        elif name in ACTIVATIONS:
+            activations.append(name)
+        else:
+            raise ValueError('Cannot export the layer ' + name + ' to NumPy')
+    return NumpyPolicy(weights, activations)
@@ -0,0 +1,115 @@
+import math
+import argparse
+import numpy as np
+from loraPhy import Q_MAX, QR, MAX_BATTERY_LEVEL, ACTION_BER, ACTION_TXR, action_table, packet_reception_rate, \
+    duty_cycle_cost, step_reward
+from policyTable import PolicyTable
+from evaluation import evaluate_model_batched, METRICS
+from store import ResultStore
+
+# Grid of plot.py
+NODES = [1, 5, 10, 15, 20]
+# Cells of the default grid along q, and e cells drained by the cheapest action (they set the cells along e)
+Q_BINS = 64
+E_CELLS_PER_STEP = 8
+
+
+def step_model(N):
+    """
+    Outcome of every action for every number of external nodes 0..N in loraEnv(N).step, which does not depend on
+    the state but for the budgets it drains: the number of transmitted packets, hence PDR and PRR, only depends
+    on n and the action
+    :return: (rewards, duty-cycle costs, e_pkt), the first two with shape (12, N + 1) and e_pkt with shape (12,)
+    """
+    n = np.arange(N + 1)
+    # discard_lowest_g_packets keeps n - ceil(n / 2) of the n packets
+    transmitted = n - np.ceil(n / 2).astype(int)
+    pdr = transmitted / np.maximum(n, 1)
+    prr = packet_reception_rate(ACTION_BER[:, None], transmitted)
+    costs = duty_cycle_cost(transmitted, ACTION_TXR[:, None])
+    e_pkt = action_table(N)['e_pkt']
+    rewards = step_reward(prr, pdr, e_pkt[:, None])
+    return rewards, costs, e_pkt
+
+
+def solve(N, q_bins=Q_BINS, e_bins=None):
+    """
+    Policy of loraEnv(N) with the largest return (undiscounted sum of rewards until the episode ends) from every
+    state of a (q, e, n) grid, found by dynamic programming. The state of a cell is its lower corner, as
+    PolicyTable picks cells by flooring q and e. Every action drains the battery by e_pkt, more than one e cell, so
+    the values of a column of e cells only depend on lower columns: one sweep from empty to full battery gives the
+    fixed point of value iteration, each column being updated for all the actions, n and q at once.
+    :param N: (int) number of external nodes the environment is created with
+    :param e_bins: (int) cells along e, by default E_CELLS_PER_STEP cells per e_pkt of the cheapest action
+    :return: (PolicyTable with the optimal action of every cell, values of shape (q_bins, e_bins, N + 1))
+    """
+    rewards, costs, e_pkt = step_model(N)
+    q_step = Q_MAX / q_bins
+    if e_bins is None:
+        e_bins = int(math.ceil(MAX_BATTERY_LEVEL / e_pkt.min() * E_CELLS_PER_STEP))
+    e_step = MAX_BATTERY_LEVEL / e_bins
+    if e_pkt.min() < e_step:
+        raise ValueError('The e cells must be narrower than the cheapest action (' + str(e_pkt.min()) + ' J)')
+
+    # q cell reached by every action from every q cell, shape (12, N + 1, q_bins)
+    q = np.arange(q_bins) * q_step
+    q_after = q - costs[:, :, None]
+    q_over = q_after <= 0
+    next_q = np.minimum((np.minimum(q_after + QR, Q_MAX) / q_step).astype(int), q_bins - 1)
+    next_q[q_over] = 0
+    # e cells drained by every action: the next state of grid point j is j - drained, between two grid points, and
+    # its value is interpolated linearly between them (the battery is empty if j - drained <= 0)
+    drained = e_pkt / e_step
+    n = np.arange(N + 1)[None, :, None]
+    values = np.zeros((e_bins, N + 1, q_bins))
+    policy = np.zeros((e_bins, N + 1, q_bins), dtype=np.uint8)
+    for j in range(e_bins):
+        next_e = j - drained
+        below = np.maximum(np.floor(next_e).astype(int), 0)
+        weight = (next_e - np.floor(next_e))[:, None, None]
+        below = below[:, None, None]
+        future = (1 - weight) * values[below, n, next_q] + weight * values[below + 1, n, next_q]
+        future[q_over | (next_e <= 0)[:, None, None]] = 0
+        returns = rewards[:, :, None] + future
+        policy[j] = np.argmax(returns, axis=0)
+        values[j] = np.max(returns, axis=0)
+    return PolicyTable(policy.transpose(2, 0, 1)), values.transpose(2, 0, 1)
+
+
+def optimal_results(n_nodes, N=None, q_bins=Q_BINS, e_bins=None):
+    """
+    Metrics of the optimal policy of loraEnv(N) for every number of external nodes in n_nodes. The environment is
+    deterministic, so one episode per n gives them exactly.
+    :param N: (int) number of external nodes the environment is created with, n_nodes[k] for n_nodes[k] by default
+    :return: list with one dict per element of n_nodes as returned by evaluation.evaluate_model
+    """
+    if N is not None:
+        table, _values = solve(N, q_bins, e_bins)
+        return evaluate_model_batched(table, n_nodes, N)
+    results = []
+    for n in n_nodes:
+        table, _values = solve(n, q_bins, e_bins)
+        results += evaluate_model_batched(table, [n], n)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluate the optimal policy (OPTIMAL bars of plot.py)')
+    parser.add_argument('--nodes', type=int, nargs='+', default=NODES)
+    parser.add_argument('--N', type=int, help='N of loraEnv(N), the number of nodes of each cell by default')
+    parser.add_argument('--q-bins', type=int, default=Q_BINS)
+    parser.add_argument('--e-bins', type=int, help='cells along e, 8 per e_pkt of the cheapest action by default')
+    parser.add_argument('--store', default='results/store', help='folder of the result store')
+    args = parser.parse_args()
+
+    store = ResultStore(args.store)
+    results = optimal_results(args.nodes, args.N, args.q_bins, args.e_bins)
+    print("nodes  steps   PDR     PRR")
+    for n_nodes, result in zip(args.nodes, results):
+        store.put_results({metric: result[metric] for metric in METRICS}, n_nodes, 'opt')
+        print(f"{n_nodes:5d}  {len(result['energy']):5d}  {np.mean(result['pdr']):.4f}  {np.mean(result['prr']):.4f}")
+    print('Results saved in ' + args.store)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+import os
+import argparse
+import numpy as np
+from loraPhy import Q_MAX, MAX_BATTERY_LEVEL
+from evaluation import evaluate_model_batched
+
+# Cells of the default grid along q and e, n gets one cell per number of external nodes
+Q_BINS = 64
+E_BINS = 64
+
+
+class PolicyTable:
+    """
+    Decision table of a policy over the observation (q, e, n) of loraEnv(N): q and e are split into q_bins and e_bins
+    cells of the same width and n has one cell per value 0..N, each cell holding the action the policy takes at its
+    centre. Picking an action is one array index, without the forward pass of the network.
+    Build it with compile_policy(model, N) and keep it with save(path) / PolicyTable.load(path). With 64 x 64 cells
+    and N = 20 the table takes 84 kB (one byte per cell).
+
+    :param actions: (uint8 array of shape (q_bins, e_bins, N + 1)) action of each cell
+    :param normalize_obs: (bool) the observations are normalized as in loraEnv(N, normalize_obs=True)
+    """
+
+    def __init__(self, actions, normalize_obs=False):
+        self.actions = np.asarray(actions, dtype=np.uint8)
+        self.normalize_obs = normalize_obs
+        q_bins, e_bins, n_cells = self.actions.shape
+        self.N = n_cells - 1
+        self.q_step = Q_MAX / q_bins
+        self.e_step = MAX_BATTERY_LEVEL / e_bins
+        # Multiplies a normalized observation back to (q, e, n)
+        self.scale = (Q_MAX, MAX_BATTERY_LEVEL, self.N) if normalize_obs else (1, 1, 1)
+
+    def centres(self):
+        """Observation at the centre of every cell, with shape (q_bins, e_bins, N + 1, 3)"""
+        q_bins, e_bins, n_cells = self.actions.shape
+        q = (np.arange(q_bins) + 0.5) * self.q_step
+        e = (np.arange(e_bins) + 0.5) * self.e_step
+        grid = np.stack(np.meshgrid(q, e, np.arange(n_cells), indexing='ij'), axis=-1)
+        return grid / np.array(self.scale)
+
+    def cells(self, observation):
+        """Cell (q index, e index, n) of one observation or of a batch of them (one per row)"""
+        x = np.asarray(observation, dtype=np.float64) * np.array(self.scale)
+        q_bins, e_bins, n_cells = self.actions.shape
+        return (np.clip((x[..., 0] / self.q_step).astype(int), 0, q_bins - 1),
+                np.clip((x[..., 1] / self.e_step).astype(int), 0, e_bins - 1),
+                np.clip(np.rint(x[..., 2]).astype(int), 0, n_cells - 1))
+
+    def action(self, q, e, n):
+        """Action for the observation (q, e, n) given as Python numbers, without any NumPy call but the index"""
+        q_bins, e_bins, n_cells = self.actions.shape
+        scale_q, scale_e, scale_n = self.scale
+        i = min(max(int(q * scale_q / self.q_step), 0), q_bins - 1)
+        j = min(max(int(e * scale_e / self.e_step), 0), e_bins - 1)
+        k = min(max(int(round(n * scale_n)), 0), n_cells - 1)
+        return int(self.actions[i, j, k])
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True):
+        """
+        Same signature as the predict() of SB3 models
+        :param observation: one observation or a batch of them (one per row)
+        :return: (action or array of actions, None)
+        """
+        return self.actions[self.cells(observation)], None
+
+    def save(self, path):
+        np.savez_compressed(path, actions=self.actions, normalize_obs=self.normalize_obs)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls(arrays['actions'], bool(arrays['normalize_obs']))
+
+
+def compile_policy(model, N, q_bins=Q_BINS, e_bins=E_BINS, normalize_obs=False):
+    """
+    Tabulate the deterministic actions of a trained policy at the centres of a (q, e, n) grid
+    :param model: SB3 model or numpyPolicy.NumpyPolicy (anything with predict(observations) for a batch)
+    :param N: (int) number of external nodes of the environment the model was trained on
+    :param normalize_obs: (bool) the model was trained with normalized observations (sac.py --normalize-obs)
+    :return: PolicyTable
+    """
+    table = PolicyTable(np.zeros((q_bins, e_bins, N + 1), dtype=np.uint8), normalize_obs)
+    centres = table.centres()
+    actions, _states = model.predict(centres.reshape(-1, 3), deterministic=True)
+    table.actions[...] = np.asarray(actions).reshape(centres.shape[:-1])
+    return table
+
+
+def visited_observations(model, N, normalize_obs=False):
+    """Observations seen while the model runs a whole episode for every n in 1..N, one per row"""
+    from batchedLoraEnv import BatchedLoraEnv
+    env = BatchedLoraEnv(N, N, normalize_obs=normalize_obs, auto_reset=False)
+    observations = env.set_nodes(np.arange(1, N + 1))
+    running = np.ones(N, dtype=bool)
+    visited = []
+    while running.any():
+        visited.append(observations[running].copy())
+        actions, _states = model.predict(observations, deterministic=True)
+        observations, rewards, dones, infos = env.step(actions)
+        running &= ~dones
+    return np.concatenate(visited)
+
+
+def fidelity_report(table, model, samples=100000, seed=0):
+    """
+    Compare a PolicyTable with the model it was compiled from
+    :param samples: (int) observations drawn uniformly over the observation space
+    :return: dict with the fraction of observations where both pick the same action, drawn uniformly (uniform) and
+      seen while the model runs an episode for every n in 1..N (visited), and per n the episode length and mean PRR
+      and PDR of both (lists indexed by n - 1)
+    """
+    N = table.N
+    rng = np.random.default_rng(seed)
+    uniform = np.stack([rng.uniform(0, Q_MAX, samples), rng.uniform(0, MAX_BATTERY_LEVEL, samples),
+                        rng.integers(1, N, size=samples, endpoint=True)], axis=1) / np.array(table.scale)
+    visited = visited_observations(model, N, table.normalize_obs)
+    report = {}
+    for name, observations in [('uniform', uniform), ('visited', visited)]:
+        expected, _states = model.predict(observations, deterministic=True)
+        report[name] = float(np.mean(table.predict(observations)[0] == expected))
+
+    # The table holds the deterministic actions of the model, so its episodes are compared with deterministic ones
+    n_nodes = np.arange(1, N + 1)
+    for name, policy in [('model', model), ('table', table)]:
+        results = evaluate_model_batched(policy, n_nodes, N, normalize_obs=table.normalize_obs, deterministic=True)
+        report[name + '_steps'] = [len(r['energy']) for r in results]
+        report[name + '_prr'] = [float(np.mean(r['prr'])) for r in results]
+        report[name + '_pdr'] = [float(np.mean(r['pdr'])) for r in results]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile a trained model into a (q, e, n) decision table')
+    parser.add_argument('model', help='model saved by sac.py (.zip) or numpyPolicy.NumpyPolicy (.npz)')
+    parser.add_argument('--N', type=int, default=20, help='N of the loraEnv(N) the model was trained on')
+    parser.add_argument('--q-bins', type=int, default=Q_BINS)
+    parser.add_argument('--e-bins', type=int, default=E_BINS)
+    parser.add_argument('--normalize-obs', action='store_true', help='the model was trained with --normalize-obs')
+    parser.add_argument('--output', default='logs/policy_table.npz')
+    args = parser.parse_args()
+
+    if args.model.endswith('.npz'):
+        from numpyPolicy import NumpyPolicy
+        model = NumpyPolicy.load(args.model)
+    else:
+        from stable_baselines3 import PPO
+        model = PPO.load(args.model)
+
+    table = compile_policy(model, args.N, args.q_bins, args.e_bins, args.normalize_obs)
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    table.save(args.output)
+    report = fidelity_report(table, model)
+    print(f"{table.actions.size} cells ({table.actions.nbytes / 1024:.1f} kB) saved in {args.output}")
+    print(f"same action: {report['uniform']:.4f} of uniform observations, {report['visited']:.4f} of visited ones")
+    print("  n  model steps  table steps  model PRR  table PRR")
+    for n in range(1, table.N + 1):
+        print(f"{n:3d}  {report['model_steps'][n - 1]:11d}  {report['table_steps'][n - 1]:11d}"
+              f"  {report['model_prr'][n - 1]:9.4f}  {report['table_prr'][n - 1]:9.4f}")
+
+
+if __name__ == '__main__':
+    main()
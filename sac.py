@@ -1,4 +1,9 @@
+import io
 import os
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import gym
 import numpy as np
 #from roadenvacbeta import *
@@ -13,10 +18,11 @@ from stable_baselines3.common.env_util import make_vec_env
 from stable_baselines3.common.env_checker import check_env
 from stable_baselines3.common.callbacks import BaseCallback
 from stable_baselines3.common.noise import NormalActionNoise
+from stable_baselines3.common.utils import set_random_seed
 from stable_baselines3.common.callbacks import CheckpointCallback
-from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecNormalize
 from stable_baselines3.common.results_plotter import load_results, ts2xy
-from loraEnv import loraEnv
+from loraEnv import loraEnv, spawn_seeds
 
 def store(dir, rewards):
     # Create policy
@@ -67,32 +73,44 @@ class SaveOnBestTrainingRewardCallback(BaseCallback):
     """
     Callback for saving a model (the check is done every ``check_freq`` steps)
     based on the training reward (in practice, we recommend using ``EvalCallback``).
+    The returns of the last ``window`` episodes are kept in memory, taken from the ``episode``
+    stats that the ``Monitor`` wrapper adds to ``infos``, so a check does not read the monitor files.
+    The model is serialized in memory when it improves and written to disk by a background thread.
 
     :param check_freq: (int)
     :param log_dir: (str) Path to the folder where the model will be saved.
-      It must contains the file created by the ``Monitor`` wrapper.
+      The environments must be wrapped with ``Monitor``.
     :param verbose: (int)
+    :param window: (int) number of episodes of the mean training reward
     """
 
-    def __init__(self, check_freq: int, log_dir: str, verbose=1):
+    def __init__(self, check_freq: int, log_dir: str, verbose=1, window=100):
         super(SaveOnBestTrainingRewardCallback, self).__init__(verbose)
         self.check_freq = check_freq
         self.log_dir = log_dir
         self.save_path = os.path.join(log_dir, 'best_model')
         self.best_mean_reward = -np.inf
+        self.episode_rewards = deque(maxlen=window)
+        self.saver = None
+        self.last_save = None  # Future of the last write, its errors are raised by the next save or at the end
 
     def _init_callback(self) -> None:
         # Create folder if needed
         if self.save_path is not None:
             os.makedirs(self.save_path, exist_ok=True)
+        # A single thread, so the saves are written in order
+        self.saver = ThreadPoolExecutor(max_workers=1)
 
     def _on_step(self) -> bool:
+        for info in self.locals['infos']:
+            if 'episode' in info:
+                self.episode_rewards.append(info['episode']['r'])
+
         if self.n_calls % self.check_freq == 0:
             # Retrieve training reward
-            x, y = ts2xy(load_results(self.log_dir), 'timesteps')
-            if len(x) > 0:
-                # Mean training reward over the last 100 episodes
-                mean_reward = np.mean(y[-100:])
+            if len(self.episode_rewards) > 0:
+                # Mean training reward over the last episodes
+                mean_reward = np.mean(self.episode_rewards)
                 if self.verbose > 0:
                     print(f"Num timesteps: {self.num_timesteps}")
                     print(f"Best mean reward: {self.best_mean_reward:.2f} - Last mean reward per episode: {mean_reward:.2f}")
@@ -103,56 +121,155 @@ class SaveOnBestTrainingRewardCallback(BaseCallback):
                     # Example for saving best model
                     if self.verbose > 0:
                         print(f"Saving new best model to {self.save_path}.zip")
-                    self.model.save(self.save_path)
+                    # The snapshot is taken now, only the file writing is left to the saver thread
+                    snapshot = io.BytesIO()
+                    self.model.save(snapshot)
+                    if self.last_save is not None:
+                        self.last_save.result()
+                    self.last_save = self.saver.submit(self._write, snapshot.getvalue())
         return True
 
+    def _write(self, data):
+        tmp_path = self.save_path + '.zip.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self.save_path + '.zip')
+
+    def _on_training_end(self) -> None:
+        # Wait for the last save and raise its error, if any
+        self.saver.shutdown(wait=True)
+        if self.last_save is not None:
+            self.last_save.result()
+
+
+def check(N=20, normalize_obs=False):
+    """Validate the environment and try one random step"""
+    env = loraEnv(N, normalize_obs=normalize_obs)
+    """TASK update env and input parameters"""
+
+    #### Validate the environment
+    # It will check your custom environment and output additional warnings if needed
+    check_env(env)
+
+    print("Observation space: ", env.observation_space)  # cual es el estado actual
+    print("Shape: ", env.observation_space.shape)  # la forma del estado
+    print("Action space: ", env.action_space)  # shape de la acción (número)
+
+    # The reset method is called at the beginning of an episode
+    obs = env.reset()  # se resetea. Tienes un nuevo estado, una nueva observación
+    # Sample a random action
+    action = env.action_space.sample()  # Coges una acción al azar
+    print("Sampled action: ", action)
+
+    obs, reward, done, info = env.step(action)
+
+    print(obs.shape, reward, done, info)  # pruebo que la recompensa sale bien
+
+
+def make_lora_env(N, rank, log_dir, seed=None, normalize_obs=False):
+    """
+    Factory of one training worker: loraEnv with episodes of 200 steps, logged by Monitor to log_dir/<rank>.monitor.csv
+    :param rank: (int) index of the worker
+    :param seed: (int, SeedSequence or None) seed of its environment, see loraEnv.spawn_seeds
+    :param normalize_obs: (bool) see loraEnv
+    """
+    def _init():
+        env = loraEnv(N, normalize_obs=normalize_obs, seed=seed)
+        env = wrappers.TimeLimit(env, max_episode_steps=200)  # cada episodio tenga 200 iter max
+        env = Monitor(env, os.path.join(log_dir, str(rank)))
+        return env
+    return _init
+
 
-log_dir = "logs/" # carpeta logs para meter todos los resultados
-os.makedirs(log_dir, exist_ok=True)
+def make_training_env(N, n_workers, log_dir, seed=0, normalize_obs=False):
+    """
+    n_workers independent loraEnv workers, each one stepping in its own process when there is more than one.
+    Worker i gets the i-th seed spawned from seed, so it draws the same random numbers with any number of workers.
+    """
+    seeds = spawn_seeds(seed, n_workers)
+    env_fns = [make_lora_env(N, rank, log_dir, seeds[rank], normalize_obs) for rank in range(n_workers)]
+    if n_workers == 1:
+        return DummyVecEnv(env_fns)
+    return SubprocVecEnv(env_fns)
 
-# Don't forget that it has been load from RoadEnvAC, not RoadEnv
-env = loraEnv(20)
-"""TASK update env and input parameters"""
 
-#### Validate the environment
-# It will check your custom environment and output additional warnings if needed
-check_env(env)
+def train(n_workers=1, total_timesteps=1500000, log_dir="logs/", N=20, seed=0, callback=None, normalize_obs=False):
+    """
+    Train PPO on n_workers loraEnv workers
+    :param normalize_obs: (bool) train on the normalized float32 observations of loraEnv, the model must then
+      be evaluated with normalize_obs=True as well
+    :return: (model, elapsed seconds)
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    env = make_training_env(N, n_workers, log_dir, seed, normalize_obs)
+    # PPO(seed=seed) would reseed the workers with seed + rank, so only torch, numpy and random are seeded here
+    set_random_seed(seed)
+    model = PPO('MlpPolicy', env, verbose=0, gamma=0.9, learning_rate=0.0001, batch_size=128)
+    #model = SAC('MlpPolicy', env, verbose=0, gamma=0.9, learning_rate=0.0001, batch_size=128)
+    start = time.perf_counter()
+    model.learn(total_timesteps=total_timesteps, callback=callback)
+    elapsed = time.perf_counter() - start
+    env.close()
+    return model, elapsed
+
+
+def scaling(worker_counts, total_timesteps, log_dir="logs/scaling/", N=20, normalize_obs=False):
+    """
+    Train for total_timesteps with each number of workers and report the wall-clock time and speed-up
+    :return: list of (workers, seconds, steps per second)
+    """
+    report = []
+    for n_workers in worker_counts:
+        model, elapsed = train(n_workers, total_timesteps, os.path.join(log_dir, str(n_workers)), N,
+                               normalize_obs=normalize_obs)
+        report.append((n_workers, elapsed, total_timesteps / elapsed))
+    print("workers  seconds  steps/s  speed-up")
+    for n_workers, elapsed, steps_per_second in report:
+        print(f"{n_workers:7d}  {elapsed:7.1f}  {steps_per_second:7.0f}  {report[0][1] / elapsed:8.2f}")
+    return report
 
-print("Observation space: ", env.observation_space)  # cual es el estado actual
-print("Shape: ", env.observation_space.shape)  # la forma del estado
-print("Action space: ", env.action_space)  # shape de la acción (número)
 
-# The reset method is called at the beginning of an episode
-obs = env.reset()  # se resetea. Tienes un nuevo estado, una nueva observación
-# Sample a random action
-action = env.action_space.sample()  # Coges una acción al azar
-print("Sampled action: ", action)
+def main():
+    parser = argparse.ArgumentParser(description='Train PPO on loraEnv')
+    parser.add_argument('--workers', type=int, default=1, help='number of environment processes')
+    parser.add_argument('--timesteps', type=int, default=1500000)
+    parser.add_argument('--nodes', type=int, default=20, help='N of loraEnv(N)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--log-dir', default="logs/")  # carpeta logs para meter todos los resultados
+    parser.add_argument('--scaling', type=int, nargs='+',
+                        help='only report the training speed with each of these numbers of workers')
+    parser.add_argument('--check', action='store_true', help='validate the environment before training')
+    parser.add_argument('--normalize-obs', action='store_true',
+                        help='observe [q / Q_MAX, e / MAX_BATTERY_LEVEL, n / N] as float32')
+    args = parser.parse_args()
 
-obs, reward, done, info = env.step(action)
+    if args.scaling:
+        scaling(args.scaling, args.timesteps, os.path.join(args.log_dir, "scaling"), args.nodes, args.normalize_obs)
+        return
 
-print(obs.shape, reward, done, info)  # pruebo que la recompensa sale bien
+    if args.check:
+        check(args.nodes, args.normalize_obs)
 
-#### Training / Empieza el entrenamiento
-env = wrappers.TimeLimit(env, max_episode_steps=200)  # cada episodio tenga 200 iter max
-env = Monitor(env, log_dir)
-env = make_vec_env(lambda: env, n_envs=1)
+    #### Training / Empieza el entrenamiento
+    callback = SaveOnBestTrainingRewardCallback(check_freq=10000, log_dir=args.log_dir, verbose=1)  # guarda el mejor modelo
+    model, elapsed = train(args.workers, args.timesteps, args.log_dir, args.nodes, args.seed, callback,
+                           args.normalize_obs)
+    print(f"{args.workers} workers: {args.timesteps / elapsed:.0f} steps/s ({elapsed:.1f} s)")
 
-callback = SaveOnBestTrainingRewardCallback(check_freq=10000, log_dir=log_dir, verbose=1)  # guarda el mejor modelo
-model = PPO('MlpPolicy', env, verbose=0, gamma=0.9, learning_rate=0.0001, batch_size=128)
+    version = 0
 
-#model = SAC('MlpPolicy', env, verbose=0, gamma=0.9, learning_rate=0.0001, batch_size=128)
-model.learn(total_timesteps=1500000, callback=callback)
+    # Save the agent
+    model.save("lora_rl_sac_v" + str(version))
 
-version = 0
+    # Helper from the library
+    #results_plotter.plot_results([log_dir], 1e5, results_plotter.X_TIMESTEPS, "PPO")
+    plot_results(args.log_dir, version)  # coge de la carpeta log el mejor modelo con la versión q le pongas y pinta la
+    #la recompensa q has tenido durante el tiempo de entrenamiento
 
-# Save the agent
-model.save("lora_rl_sac_v" + str(version))
+    # How to load previous trained model
+    #model = A2C.load("logs/best_model_v1.zip")
+    #model.set_env(env)
 
-# Helper from the library
-#results_plotter.plot_results([log_dir], 1e5, results_plotter.X_TIMESTEPS, "PPO")
-plot_results(log_dir, version)  # coge de la carpeta log el mejor modelo con la versión q le pongas y pinta la
-#la recompensa q has tenido durante el tiempo de entrenamiento
 
-# How to load previous trained model
-#model = A2C.load("logs/best_model_v1.zip")
-#model.set_env(env)
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+import os
+import re
+import glob
+import argparse
+import numpy as np
+
+# Longest metric and label names the index can hold
+NAME_CHARS = 16
+# One row per stored series: which cell it belongs to and where its values are in data.bin
+INDEX_DTYPE = np.dtype([('metric', 'U' + str(NAME_CHARS)), ('nodes', np.int64), ('label', 'U' + str(NAME_CHARS)),
+                        ('offset', np.int64), ('length', np.int64)])
+OPT_NODES = 0  # nodes of the series that do not depend on the number of nodes, e.g. pdr_opt.txt
+
+
+class ResultStore:
+    """
+    Evaluation results of every (metric, nodes, label) cell in one binary container.
+    The values of all the cells are appended as float64 to ``data.bin`` and ``index.npy`` tells where each
+    cell starts and how long it is, so reading a cell is a slice of a read-only memory map (no copy, no parsing).
+    The label is the SF index (1 => SF = 7, ..., 6 => SF = 12) for fixed actions, 'opt' for the optimal
+    baseline or any name given to a trained model.
+
+    :param path: (str) folder of the store
+    """
+
+    def __init__(self, path='results/store'):
+        self.path = path
+        self.data_path = os.path.join(path, 'data.bin')
+        self.index_path = os.path.join(path, 'index.npy')
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(self.index_path):
+            self.index = np.load(self.index_path)
+        else:
+            self.index = np.zeros(0, dtype=INDEX_DTYPE)
+        self._keys = {(str(r['metric']), int(r['nodes']), str(r['label'])): i for i, r in enumerate(self.index)}
+        self._data = None
+
+    @property
+    def data(self):
+        """All the stored values as a read-only memory map"""
+        size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        if self._data is None or self._data.nbytes != size:
+            if size == 0:
+                self._data = np.zeros(0)
+            else:
+                self._data = np.memmap(self.data_path, dtype=np.float64, mode='r')
+        return self._data
+
+    def has(self, metric, nodes, label):
+        return (metric, int(nodes), str(label)) in self._keys
+
+    def get(self, metric, nodes, label):
+        """
+        Values of one cell, a zero-copy view of the memory map
+        :raises KeyError: if the cell is not in the store
+        """
+        row = self.index[self._keys[(metric, int(nodes), str(label))]]
+        return self.data[row['offset']:row['offset'] + row['length']]
+
+    def put(self, metric, nodes, label, values):
+        """
+        Append the values of one cell. A cell that is already stored is replaced (its old values stay
+        in data.bin but are no longer indexed).
+        :raises ValueError: if the metric or the label is longer than NAME_CHARS, the index would truncate it
+        """
+        for name in [metric, str(label)]:
+            if len(name) > NAME_CHARS:
+                raise ValueError('Names of the store have at most ' + str(NAME_CHARS) + ' characters: ' + name)
+        values = np.ascontiguousarray(values, dtype=np.float64).ravel()
+        offset = os.path.getsize(self.data_path) // 8 if os.path.exists(self.data_path) else 0
+        with open(self.data_path, 'ab') as f:
+            values.tofile(f)
+        row = np.array([(metric, nodes, str(label), offset, len(values))], dtype=INDEX_DTYPE)
+        key = (metric, int(nodes), str(label))
+        if key in self._keys:
+            self.index[self._keys[key]] = row[0]
+        else:
+            self._keys[key] = len(self.index)
+            self.index = np.concatenate((self.index, row))
+        self._save_index()
+
+    def put_results(self, results, nodes, label):
+        """
+        Store every metric of an evaluation
+        :param results: dict of metric => values, as returned by evaluation.evaluate_fixed_action
+        """
+        for metric, values in results.items():
+            self.put(metric, nodes, label, values)
+
+    def keys(self):
+        return list(self._keys)
+
+    def _save_index(self):
+        # Written to a temporary file first so a crash never leaves a truncated index
+        tmp_path = self.index_path + '.tmp.npy'
+        np.save(tmp_path, self.index)
+        os.replace(tmp_path, self.index_path)
+
+
+def import_txt(folder='results', store=None):
+    """
+    Import the text files written by older versions of evaluation.py ({metric}_{nodes}_{sf}.txt and {metric}_opt.txt)
+    :param folder: (str) folder with the text files
+    :param store: ResultStore to import into, results/store by default
+    :return: the ResultStore
+    """
+    if store is None:
+        store = ResultStore(os.path.join(folder, 'store'))
+    for file in sorted(glob.glob(os.path.join(folder, '*.txt'))):
+        name = os.path.splitext(os.path.basename(file))[0]
+        match = re.fullmatch(r'([a-z]+)_(\d+)_(\w+)', name) or re.fullmatch(r'([a-z]+)_(opt)', name)
+        if match is None:
+            continue
+        if match.group(2) == 'opt':
+            metric, nodes, label = match.group(1), OPT_NODES, 'opt'
+        else:
+            metric, nodes, label = match.group(1), int(match.group(2)), match.group(3)
+        store.put(metric, nodes, label, np.loadtxt(file, dtype=float, delimiter=',', ndmin=1))
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import the results/*.txt files into the result store')
+    parser.add_argument('folder', nargs='?', default='results')
+    args = parser.parse_args()
+    store = import_txt(args.folder)
+    print(str(len(store.keys())) + ' series in ' + store.path)
+
+
+if __name__ == '__main__':
+    main()
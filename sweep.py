@@ -0,0 +1,124 @@
+import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from evaluation import evaluate_fixed_action, evaluate_model, METRICS
+from store import ResultStore, NAME_CHARS
+
+# Grid read by plot.py, the SF index goes from 1 (SF = 7) to 6 (SF = 12)
+NODES = [1, 5, 10, 15, 20]
+SF = [1, 2, 3, 4, 5, 6]
+# N of the loraEnv(N) the models are trained on, as the default of sac.py --nodes
+TRAINING_N = 20
+
+_models = {}  # models already loaded by this process, by path
+
+
+def fixed_action_cells(nodes=NODES, sf=SF):
+    """
+    Cells of the grid evaluated with a fixed action, the SF index i is the action i - 1 (CR = 4/5)
+    :return: list of (n_nodes, label, policy) tuples
+    """
+    return [(n, i, i - 1) for n in nodes for i in sf]
+
+
+def model_cells(model_path, label, nodes=NODES):
+    """
+    Cells of the grid evaluated with a saved SB3 model
+    :return: list of (n_nodes, label, policy) tuples
+    """
+    return [(n, label, model_path) for n in nodes]
+
+
+def cell_done(store, n_nodes, label):
+    return all(store.has(metric, n_nodes, label) for metric in METRICS)
+
+
+def evaluate_cell(n_nodes, label, policy, normalize_obs=False, deterministic=True, N=TRAINING_N):
+    """
+    Evaluate one cell of the grid
+    :param policy: (int) fixed action or (str) path to a model saved by sac.py or to a numpyPolicy.NumpyPolicy (.npz)
+    :param N: (int) N of the loraEnv(N) the model was trained on, it sets the payload and the normalization of n.
+      Fixed actions are evaluated with N = n_nodes
+    :param normalize_obs: (bool) the model was trained with normalized observations (sac.py --normalize-obs)
+    :param deterministic: (bool) take the most likely action of the model, so .zip and .npz give the same results
+    :return: (n_nodes, label, results)
+    """
+    if isinstance(policy, str):
+        if policy not in _models and policy.endswith('.npz'):
+            from numpyPolicy import NumpyPolicy
+            _models[policy] = NumpyPolicy.load(policy)
+        elif policy not in _models:
+            from stable_baselines3 import PPO
+            _models[policy] = PPO.load(policy)
+        results = evaluate_model(_models[policy], n_nodes, N, normalize_obs=normalize_obs, deterministic=deterministic)
+    else:
+        results = evaluate_fixed_action(n_nodes, policy)
+    return n_nodes, label, results
+
+
+def run_sweep(cells, workers=os.cpu_count(), store=None, overwrite=False, normalize_obs=False, deterministic=True,
+              N=TRAINING_N):
+    """
+    Evaluate the cells of a grid in a pool of processes and save their results in the result store.
+    Cells that are already stored are skipped unless overwrite is True, so an interrupted sweep can be rerun.
+    :param cells: list of (n_nodes, label, policy), see fixed_action_cells and model_cells
+    :param workers: (int) number of processes, 1 runs every cell in this process
+    :param store: ResultStore, results/store by default
+    :param normalize_obs: (bool) the models of the cells were trained with normalized observations
+    :param deterministic: (bool) take the most likely action of the models, see evaluate_cell
+    :param N: (int) N of the loraEnv(N) the models were trained on
+    :return: list of (n_nodes, label) evaluated
+    """
+    options = {'normalize_obs': normalize_obs, 'deterministic': deterministic, 'N': N}
+    if store is None:
+        store = ResultStore()
+    pending = [cell for cell in cells if overwrite or not cell_done(store, cell[0], cell[1])]
+    done = []
+    if workers == 1:
+        for cell in pending:
+            n_nodes, label, results = evaluate_cell(*cell, **options)
+            store.put_results(results, n_nodes, label)
+            done.append((n_nodes, label))
+        return done
+
+    # Results are saved by this process only, as they arrive
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(evaluate_cell, *cell, **options) for cell in pending]
+        for future in as_completed(futures):
+            n_nodes, label, results = future.result()
+            store.put_results(results, n_nodes, label)
+            done.append((n_nodes, label))
+            print('Cell ' + str(n_nodes) + '_' + str(label) + ': ' + str(len(results['energy'])) + ' steps')
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluate the (nodes x SF) grid used by plot.py')
+    parser.add_argument('--nodes', type=int, nargs='+', default=NODES)
+    parser.add_argument('--sf', type=int, nargs='+', default=SF, help='SF indexes (1 => SF = 7, ..., 6 => SF = 12)')
+    parser.add_argument('--model',
+                        help='evaluate this saved model (.zip, or .npz from numpyPolicy) instead of the fixed actions')
+    parser.add_argument('--label', default='model', help='label of the cells of --model')
+    parser.add_argument('--N', type=int, default=TRAINING_N, help='N of the loraEnv(N) --model was trained on '
+                        '(sac.py --nodes)')
+    parser.add_argument('--normalize-obs', action='store_true', help='--model was trained with --normalize-obs')
+    parser.add_argument('--stochastic', action='store_true',
+                        help='sample the actions of a .zip --model instead of taking the most likely one')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--store', default='results/store', help='folder of the result store')
+    parser.add_argument('--overwrite', action='store_true', help='evaluate again the cells already saved')
+    args = parser.parse_args()
+    if len(args.label) > NAME_CHARS:
+        parser.error('--label has at most ' + str(NAME_CHARS) + ' characters')
+
+    if args.model:
+        cells = model_cells(args.model, args.label, args.nodes)
+    else:
+        cells = fixed_action_cells(args.nodes, args.sf)
+    done = run_sweep(cells, args.workers, ResultStore(args.store), args.overwrite, args.normalize_obs,
+                     not args.stochastic, args.N)
+    print(str(len(done)) + ' cells evaluated, ' + str(len(cells) - len(done)) + ' already in ' + args.store)
+
+
+if __name__ == '__main__':
+    main()
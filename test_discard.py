@@ -0,0 +1,66 @@
+import numpy as np
+from loraEnv import discard_lowest_g_packets
+
+CASES = 3000
+
+
+def reference_discard(to_transmit, to_transmit_priorities, max_packets):
+    """The original three passes over the nodes, kept as the reference of discard_lowest_g_packets"""
+    transmitted = np.copy(to_transmit)
+    to_remove = sum(to_transmit) - max_packets
+    for g in [1, 2, 3]:  # Remove first low priorities, then high ones if still needed
+        for i, v in enumerate(to_transmit_priorities):
+            if to_remove > 0:
+                if v == g:
+                    transmitted[i] = 0
+                    to_remove -= 1
+    return transmitted
+
+
+def random_case(rng, shape):
+    """Random transmissions, their priorities (1, 2, 3, or anything for ~1 in 5 cases) and max_packets"""
+    n = shape[-1]
+    to_transmit = rng.integers(0, 2, size=shape)
+    if rng.random() < 0.2:
+        priorities = rng.integers(0, 5, size=shape)
+    else:
+        priorities = to_transmit * rng.integers(1, 4, size=shape)
+    # Integer, fractional (also negative) or n / 2 as in loraEnv.step
+    max_packets = [rng.integers(-3, n + 3), rng.uniform(-3, n + 3), n / 2][rng.integers(3)]
+    return to_transmit, priorities, max_packets
+
+
+def test_single_node():
+    rng = np.random.default_rng(0)
+    for _ in range(CASES):
+        to_transmit, priorities, max_packets = random_case(rng, (rng.integers(1, 40),))
+        expected = reference_discard(to_transmit, priorities, max_packets)
+        np.testing.assert_array_equal(discard_lowest_g_packets(to_transmit, priorities, max_packets), expected)
+
+
+def test_single_node_buffers():
+    rng = np.random.default_rng(1)
+    for _ in range(CASES):
+        n = rng.integers(1, 40)
+        to_transmit, priorities, max_packets = random_case(rng, (n,))
+        expected = reference_discard(to_transmit, priorities, max_packets)
+        out = np.full(n, -1)
+        work = (np.empty(n, dtype=bool), np.empty(n, dtype=int))
+        result = discard_lowest_g_packets(to_transmit, priorities, max_packets, out=out, work=work)
+        assert result is out
+        np.testing.assert_array_equal(out, expected)
+
+
+def test_batch():
+    rng = np.random.default_rng(2)
+    for _ in range(CASES // 10):
+        shape = (rng.integers(1, 20), rng.integers(1, 40))
+        to_transmit, priorities, max_packets = random_case(rng, shape)
+        per_row = rng.uniform(-3, shape[1] + 3, size=shape[0])
+        for limit in [max_packets, per_row]:
+            expected = [reference_discard(to_transmit[b], priorities[b], np.broadcast_to(limit, shape[:1])[b])
+                        for b in range(shape[0])]
+            np.testing.assert_array_equal(discard_lowest_g_packets(to_transmit, priorities, limit), expected)
+            out = np.full(shape, -1)
+            assert discard_lowest_g_packets(to_transmit, priorities, limit, out=out) is out
+            np.testing.assert_array_equal(out, expected)